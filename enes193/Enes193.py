@@ -1,14 +1,29 @@
-import network
-import time
-import json
-import _thread
+import struct
+import random
 
-from . import uwebsockets
-from .wifi_db import WIFI_MAP
+from .hal import const, time, json, network, _thread, load_asyncio
 
 # Mission formatting + constants
 from .mission import MissionFormatter
 from . import mission as _m
+from .pose import PoseHistory
+from . import msgqueue
+from .telemetry import Telemetry
+from .pose import predictor as _predictor
+
+# Websocket opcodes (uwebsockets.OP_*). uwebsockets and wifi_db are imported
+# when connecting, so "import enes193" stays cheap for tank-only scripts.
+_OP_TEXT = const(0x1)
+_OP_BYTES = const(0x2)
+
+class _NoLock:
+    # Stands in for the _thread lock in asyncio mode, where the worker runs
+    # as a task on the caller's thread and nothing needs locking.
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
 
 
 class Enes193:
@@ -109,14 +124,39 @@ class Enes193:
     WS_PORT = 7755
     WS_PATH = "/ws"
 
-    _RECONNECT_DELAY_MS = 2000
-    _WS_RECV_TIMEOUT_S = 2
+    # A dropped connection is retried at once. Further failures back off
+    # exponentially from _RECONNECT_MIN_MS up to _RECONNECT_MAX_MS, with
+    # jitter so robots don't all reconnect at the same moment.
+    _RECONNECT_MIN_MS = 250
+    _RECONNECT_MAX_MS = 8000
+    _WS_MAX_MESSAGE_SIZE = 8192
 
-    _PING_PERIOD_MS = 5000
-    _PING_MISS_LIMIT = 5
+    # Websocket ping/pong keepalive: a ping goes out every interval and the
+    # link is treated as dead if the vision system stays silent for the
+    # timeout after one (see uwebsockets.Websocket.keepalive).
+    KEEPALIVE_INTERVAL_MS = 2000
+    KEEPALIVE_TIMEOUT_MS = 3000
 
     _POSE_REQUEST_PERIOD_MS = 250  # 4Hz
 
+    # Pose subscription (server push). Polling continues until the server
+    # acknowledges, and resumes if acks or pushed poses stop arriving.
+    _POSE_SUB_ACK_TIMEOUT_MS = 1000
+    _POSE_STREAM_STALE_MS = 1000
+
+    # Longest the worker sleeps between checks of the print queue
+    _IDLE_MAX_MS = 100
+
+    # Ask the vision system for binary aruco updates (see _POSE_BIN_FMT).
+    # Servers that don't support them keep sending JSON, which still works.
+    BINARY_POSE = True
+
+    # Binary aruco update, sent as a websocket binary frame:
+    # op (=1), flags (bit 0: visible), seq, x, y, theta
+    _POSE_BIN_FMT = "<BBHfff"
+    _POSE_BIN_SIZE = 16
+    _POSE_BIN_OP = 1
+
     DEBUG = False
 
     # Mission formatter (auto-set from begin(teamType))
@@ -140,15 +180,71 @@ class Enes193:
     _hostname = None
     _mac_str = None
 
-    _x = -1.0
-    _y = -1.0
-    _theta = -1.0
-    _visible = False
-
-    _missed_pongs = 0
-
-    _print_queue = []
-    _PRINT_QUEUE_MAX = 20
+    # vision IP -> (parsed URI, resolved socket address), so reconnecting
+    # doesn't parse the URL or look the address up again
+    _ws_targets = {}
+
+    # Latest pose as one immutable tuple: (x, y, theta, visible, ticks_ms,
+    # seq). The worker replaces it with a single assignment, so readers get a
+    # consistent snapshot without taking the lock.
+    _pose = (-1.0, -1.0, -1.0, False, 0, 0)
+
+    # Recent poses for poseAt()/poseHistory(); fixed size, allocated once
+    _pose_hist = PoseHistory(32)
+
+    # Dead-reckoning estimate fed by tank motor commands (see pose.py)
+    _predictor = _predictor
+
+    # Consecutive failed connection attempts (see _backoff_ms)
+    _wifi_failures = 0
+    _ws_failures = 0
+
+    # Prebuilt message payloads (see _build_templates)
+    _msg_pong = b""
+    _msg_aruco = b""
+    _msg_print_head = b""
+    _last_pose_req_ms = 0
+
+    # asyncio mode (begin_async)
+    _async_task = None
+    _reader_task = None
+    _pose_event = None
+
+    _pose_sub_rate = 0
+    _pose_sub_pending = False
+    _pose_sub_sent_ms = None
+    _pose_streaming = False
+    _last_pose_ms = 0
+
+    # print() queue limits and what happens when it is full. Set these
+    # before begin(); the queue is allocated there.
+    PRINT_QUEUE_BYTES = 2048
+    PRINT_QUEUE_SLOTS = 32
+    PRINT_OVERFLOW = msgqueue.DROP_OLDEST
+    PRINT_BLOCK_TIMEOUT_MS = 100
+
+    # Values for PRINT_OVERFLOW
+    DROP_OLDEST = msgqueue.DROP_OLDEST
+    DROP_NEWEST = msgqueue.DROP_NEWEST
+    BLOCK = msgqueue.BLOCK
+
+    _print_queue = None
+
+    # Enes193.log() samples are summarized and sent once per period
+    TELEMETRY_PERIOD_MS = 1000
+    _telemetry = Telemetry()
+    _last_telemetry_ms = 0
+
+    # mission() submissions go out as their own message and are resent every
+    # MISSION_RETRY_MS until the server acks their seq. After
+    # MISSION_MAX_TRIES unanswered sends the text is printed instead, which
+    # is all older vision systems understand.
+    MISSION_RETRY_MS = 500
+    MISSION_MAX_TRIES = 5
+
+    _mission_seq = 0
+    _mission_pending = []   # [seq, type, value, text, tries, last_sent_ms]
+    _mission_status = {}    # seq -> True (acked) / False (sent as a print)
 
     # -------- Public API --------
 
@@ -157,17 +253,7 @@ class Enes193:
         if cls._lock is None:
             cls._lock = _thread.allocate_lock()
 
-        with cls._lock:
-            cls._team_name = str(teamName)
-            cls._team_type = str(teamType)
-
-            # Auto-set mission name from teamType (case-insensitive handled in mission.py)
-            cls._mission_fmt.set_mission(cls._team_type)
-
-            cls._marker_id = int(markerId)
-            cls._room_number = int(roomNumber)
-            cls._vision_ip = cls.ROOM_IP_MAP.get(cls._room_number, "10.112.9.116")
-            cls._stop_flag = False
+        cls._configure(teamName, teamType, markerId, roomNumber)
 
         cls._wifi_connect()
 
@@ -183,6 +269,64 @@ class Enes193:
 
         return cls.isConnected()
 
+    @classmethod
+    async def begin_async(cls, teamName, teamType, markerId, roomNumber):
+        """
+        asyncio version of begin(). The connection is run by a uasyncio task
+        instead of a thread, so call it from inside asyncio.run() and keep
+        the rest of the program async as well.
+        """
+        asyncio = load_asyncio()
+
+        if cls._thread_started:
+            raise RuntimeError("begin() already started the worker thread")
+        if cls._lock is None:
+            cls._lock = _NoLock()
+        if cls._pose_event is None:
+            cls._pose_event = asyncio.Event()
+
+        cls._configure(teamName, teamType, markerId, roomNumber)
+
+        await cls._wifi_connect_async()
+
+        if cls._async_task is None:
+            cls._async_task = asyncio.create_task(cls._worker_async())
+
+        t0 = time.ticks_ms()
+        while time.ticks_diff(time.ticks_ms(), t0) < 5000:
+            if cls.isConnected():
+                return True
+            await asyncio.sleep_ms(50)
+
+        return cls.isConnected()
+
+    @classmethod
+    async def next_pose(cls):
+        """Wait for the next ArUco update and return it as getPose() does."""
+        ev = cls._pose_event
+        ev.clear()
+        await ev.wait()
+        return cls._pose
+
+    @classmethod
+    def _configure(cls, teamName, teamType, markerId, roomNumber):
+        with cls._lock:
+            cls._team_name = str(teamName)
+            cls._team_type = str(teamType)
+
+            # Auto-set mission name from teamType (case-insensitive handled in mission.py)
+            cls._mission_fmt.set_mission(cls._team_type)
+
+            cls._marker_id = int(markerId)
+            cls._room_number = int(roomNumber)
+            cls._vision_ip = cls.ROOM_IP_MAP.get(cls._room_number, "10.112.9.116")
+            cls._stop_flag = False
+
+            cls._build_templates()
+
+            if cls._print_queue is None:
+                cls._print_queue = msgqueue.MessageQueue(cls.PRINT_QUEUE_SLOTS, cls.PRINT_QUEUE_BYTES)
+
     @classmethod
     def isConnected(cls):
         with cls._lock:
@@ -194,42 +338,166 @@ class Enes193:
 
     @classmethod
     def getX(cls):
-        with cls._lock:
-            return cls._x
+        return cls._pose[0]
 
     @classmethod
     def getY(cls):
-        with cls._lock:
-            return cls._y
+        return cls._pose[1]
 
     @classmethod
     def getTheta(cls):
-        with cls._lock:
-            return cls._theta
+        return cls._pose[2]
 
     @classmethod
     def isVisible(cls):
+        return cls._pose[3]
+
+    @classmethod
+    def getPose(cls):
+        """
+        Return (x, y, theta, visible, ticks_ms, seq) from a single ArUco
+        update. ticks_ms is when it was received and seq counts updates.
+        """
+        return cls._pose
+
+    @classmethod
+    def poseAge(cls):
+        """Milliseconds since the latest ArUco update arrived, -1 if none has."""
+        pose = cls._pose
+        if not pose[5]:
+            return -1
+        return time.ticks_diff(time.ticks_ms(), pose[4])
+
+    @classmethod
+    def poseAt(cls, ticksMs):
+        """
+        Pose at an earlier time.ticks_ms() value, interpolated from the
+        recent history, as (x, y, theta, visible, ticks_ms). None if no
+        update has arrived yet.
+        """
         with cls._lock:
-            return bool(cls._visible)
+            return cls._pose_hist.at(ticksMs)
+
+    @classmethod
+    def poseHistory(cls, n=10):
+        """The n most recent updates, newest first, as (x, y, theta, visible, ticks_ms)."""
+        with cls._lock:
+            return cls._pose_hist.latest(n)
+
+    @classmethod
+    def getPredictedPose(cls):
+        """
+        High-rate pose estimate as (x, y, theta, valid): the latest vision
+        update carried forward using the motor PWMs set through tank.
+        """
+        p = cls._predictor
+        p.correct(cls._pose)
+        return p.predict()
 
     @classmethod
     def print(cls, msg):
         s = str(msg)
+        q = cls._print_queue
+        policy = cls.PRINT_OVERFLOW
+
+        # BLOCK waits for the worker thread to make room. In asyncio mode the
+        # worker can't run while we wait, so the new message is dropped.
+        if policy == msgqueue.BLOCK and cls._thread_started:
+            n = len(s)
+            t0 = time.ticks_ms()
+            while True:
+                with cls._lock:
+                    if q.fits(n) or n > q.max_bytes:
+                        return q.push(s)
+                if time.ticks_diff(time.ticks_ms(), t0) >= cls.PRINT_BLOCK_TIMEOUT_MS:
+                    break
+                # Short, so a busy printer isn't held to one queueful per poll
+                time.sleep_ms(1)
+
+        with cls._lock:
+            return q.push(s, policy)
+
+    @classmethod
+    def log(cls, key, value):
+        """
+        Record a numeric reading under key. Readings are summarized on the
+        robot (last, min, max, average, count) and sent to the vision system
+        as one line every TELEMETRY_PERIOD_MS.
+        """
+        v = float(value)
         with cls._lock:
-            if len(cls._print_queue) >= cls._PRINT_QUEUE_MAX:
-                cls._print_queue.pop(0)
-            cls._print_queue.append(s)
+            cls._telemetry.add(key, v)
         return True
 
+    @classmethod
+    def printDropped(cls):
+        """Number of print() messages dropped because the queue was full."""
+        return cls._print_queue.dropped
+
     @classmethod
     def mission(cls, type, message):
         """
-        Mimic mission submissions by printing standardized mission text.
+        Submit a mission result. It is sent with the standardized mission
+        text and resent until the vision system acknowledges it. Returns a
+        sequence number for missionDelivered().
         Prototype: Enes100.mission(int type, int message)
         """
+        t = int(type)
+        v = int(message)
+        with cls._lock:
+            text = cls._mission_fmt.handle(t, v, str)
+            cls._mission_seq += 1
+            seq = cls._mission_seq
+            cls._mission_pending.append([seq, t, v, text, 0, None])
+        return seq
+
+    @classmethod
+    def missionDelivered(cls, seq):
+        """True once the vision system has acknowledged mission submission seq."""
+        return cls._mission_status.get(seq) is True
+
+    @classmethod
+    async def mission_async(cls, type, message):
+        """
+        asyncio version of mission(): waits until the submission is
+        acknowledged and returns True, or False if it had to be printed.
+        """
+        asyncio = load_asyncio()
+
+        seq = cls.mission(type, message)
+        while seq not in cls._mission_status:
+            await asyncio.sleep_ms(20)
+        return cls._mission_status[seq]
+
+    @classmethod
+    def subscribePose(cls, rateHz=10):
+        """
+        Ask the vision system to push pose updates at rateHz instead of
+        being polled. Falls back to polling if the server does not support
+        it. rateHz=0 goes back to polling.
+        """
+        rate = max(0, int(rateHz))
         with cls._lock:
-            fmt = cls._mission_fmt
-        return fmt.handle(int(type), int(message), cls.print)
+            cls._pose_sub_rate = rate
+            cls._pose_sub_pending = cls._connected
+            if rate == 0:
+                cls._pose_streaming = False
+        return True
+
+    @classmethod
+    def isPoseStreaming(cls):
+        return bool(cls._pose_streaming)
+
+    @classmethod
+    def getRTT(cls):
+        """
+        Round-trip time to the vision system in ms, from the latest keepalive
+        ping. -1 if not connected or not measured yet.
+        """
+        ws = cls._ws
+        if ws is None:
+            return -1
+        return ws.rtt_ms
 
     @classmethod
     def stop(cls):
@@ -246,87 +514,172 @@ class Enes193:
 
     @classmethod
     def _worker_thread(cls):
-        last_ping_ms = time.ticks_ms()
-        last_pose_req_ms = time.ticks_ms()
-
-        while True:
-            with cls._lock:
-                if cls._stop_flag:
-                    break
-
+        while not cls._stop_flag:
             if not cls._wifi_ok():
+                # The websocket can't survive losing WiFi
+                cls._drop_ws()
                 try:
-                    cls._wifi_connect()
+                    cls._wifi_connect(cls._wifi_failures > 0)
+                    cls._wifi_failures = 0
                 except Exception as e:
                     if cls.DEBUG:
                         print("[enes100] wifi_connect failed:", repr(e))
-                    cls._drop_ws()
-                    time.sleep_ms(cls._RECONNECT_DELAY_MS)
+                    cls._wifi_failures += 1
+                    time.sleep_ms(cls._backoff_ms(cls._wifi_failures))
                     continue
 
             if not cls._ws_ok():
                 try:
                     cls._connect_ws_and_begin()
-                    last_ping_ms = time.ticks_ms()
-                    last_pose_req_ms = time.ticks_ms()
                 except Exception as e:
                     if cls.DEBUG:
                         print("[enes100] ws_connect failed:", repr(e))
                     cls._drop_ws()
-                    time.sleep_ms(cls._RECONNECT_DELAY_MS)
+                    cls._ws_failures += 1
+                    time.sleep_ms(cls._backoff_ms(cls._ws_failures))
                     continue
 
-            now = time.ticks_ms()
+            try:
+                wait_ms = cls._service(time.ticks_ms())
+            except Exception:
+                cls._drop_ws()
+                continue
 
-            cls._flush_print_queue()
+            # Sleep in poll() until the server sends something or the next
+            # timer is due, then handle everything that has arrived.
+            try:
+                cls._ws_drain(wait_ms)
+            except Exception:
+                cls._drop_ws()
 
-            if time.ticks_diff(now, last_ping_ms) >= cls._PING_PERIOD_MS:
-                last_ping_ms = now
+        cls._drop_ws()
+        with cls._lock:
+            cls._thread_started = False
+
+    # -------- asyncio worker --------
+
+    @classmethod
+    async def _worker_async(cls):
+        asyncio = load_asyncio()
+
+        while not cls._stop_flag:
+            if not cls._wifi_ok():
+                cls._drop_ws()
                 try:
-                    cls._ws_send({"op": "ping", "teamName": cls._team_name, "status": "ping"})
-                    with cls._lock:
-                        cls._missed_pongs += 1
-                        if cls._missed_pongs >= cls._PING_MISS_LIMIT:
-                            if cls.DEBUG:
-                                print("[enes100] missed pongs -> disconnect")
-                            cls._drop_ws()
-                            continue
-                except Exception:
-                    cls._drop_ws()
+                    await cls._wifi_connect_async(cls._wifi_failures > 0)
+                    cls._wifi_failures = 0
+                except Exception as e:
+                    if cls.DEBUG:
+                        print("[enes100] wifi_connect failed:", repr(e))
+                    cls._wifi_failures += 1
+                    await asyncio.sleep_ms(cls._backoff_ms(cls._wifi_failures))
                     continue
 
-            if time.ticks_diff(now, last_pose_req_ms) >= cls._POSE_REQUEST_PERIOD_MS:
-                last_pose_req_ms = now
+            if not cls._ws_ok():
                 try:
-                    cls._ws_send({"op": "aruco", "teamName": cls._team_name})
-                except Exception:
+                    await cls._connect_ws_and_begin_async()
+                except Exception as e:
+                    if cls.DEBUG:
+                        print("[enes100] ws_connect failed:", repr(e))
                     cls._drop_ws()
+                    cls._ws_failures += 1
+                    await asyncio.sleep_ms(cls._backoff_ms(cls._ws_failures))
                     continue
 
-            for _ in range(4):
-                msg = None
-                try:
-                    msg = cls._ws_recv()
-                except Exception:
-                    cls._drop_ws()
+            ws = cls._ws
+            try:
+                wait_ms = cls._service(time.ticks_ms())
+                if ws is not None:
+                    await ws.flush_async()
+            except Exception:
+                cls._drop_ws()
+                continue
 
-                if not msg:
-                    break
+            # Incoming messages are handled by the reader task as they arrive
+            await asyncio.sleep_ms(wait_ms)
+
+        cls._drop_ws()
+        cls._async_task = None
+
+    @classmethod
+    async def _reader_async(cls, ws):
+        # One per connection: handles incoming messages as they arrive.
+        try:
+            while ws.open:
+                msg = await ws.recv_view_async()
+                if msg:
+                    cls._handle_message(msg[0], msg[1])
+        except Exception as e:
+            if cls.DEBUG:
+                print("[enes100] ws_recv failed:", repr(e))
+        if cls._ws is ws:
+            cls._reader_task = None
+            cls._drop_ws()
+
+    # -------- Periodic work (shared by both workers) --------
 
-                cls._handle_message(msg)
+    @classmethod
+    def _service(cls, now):
+        # Does whatever periodic work is due and returns how many ms the
+        # worker may sleep before calling again. Raises if a send fails; the
+        # caller drops the connection.
+        cls._flush_print_queue()
 
-            time.sleep_ms(10)
+        mission_wait = cls._send_missions(now) if cls._mission_pending else cls._IDLE_MAX_MS
 
-        cls._drop_ws()
-        with cls._lock:
-            cls._thread_started = False
+        ws = cls._ws
+        if ws is None:
+            raise RuntimeError("ws not connected")
+        # Pings the server when due; raises once it has stopped answering
+        keepalive_wait = ws.check_keepalive()
+
+        if cls._pose_sub_pending:
+            cls._send_subscribe(now)
+
+        stale_ms = max(cls._POSE_STREAM_STALE_MS, 3000 // max(1, cls._pose_sub_rate))
+        if cls._pose_streaming:
+            if time.ticks_diff(now, cls._last_pose_ms) >= stale_ms:
+                if cls.DEBUG:
+                    print("[enes100] pose stream stalled -> polling")
+                cls._pose_streaming = False
+        elif cls._pose_sub_sent_ms is not None:
+            if time.ticks_diff(now, cls._pose_sub_sent_ms) >= cls._POSE_SUB_ACK_TIMEOUT_MS:
+                if cls.DEBUG:
+                    print("[enes100] no subscribe ack -> polling")
+                cls._pose_sub_sent_ms = None
+
+        if (not cls._pose_streaming
+                and time.ticks_diff(now, cls._last_pose_req_ms) >= cls._POSE_REQUEST_PERIOD_MS):
+            cls._last_pose_req_ms = now
+            cls._ws_send_raw(cls._msg_aruco)
+
+        if time.ticks_diff(now, cls._last_telemetry_ms) >= cls.TELEMETRY_PERIOD_MS:
+            cls._last_telemetry_ms = now
+            with cls._lock:
+                line = cls._telemetry.take()
+            if line:
+                cls._ws_send_raw(cls._msg_print_head, json.dumps(line).encode(), b"}")
+
+        if cls._print_queue:
+            return 0
+
+        wait = cls.TELEMETRY_PERIOD_MS - time.ticks_diff(now, cls._last_telemetry_ms)
+        wait = min(wait, mission_wait)
+        if keepalive_wait >= 0:
+            wait = min(wait, keepalive_wait)
+        if cls._pose_streaming:
+            wait = min(wait, stale_ms - time.ticks_diff(now, cls._last_pose_ms))
+        else:
+            wait = min(wait, cls._POSE_REQUEST_PERIOD_MS - time.ticks_diff(now, cls._last_pose_req_ms))
+            if cls._pose_sub_sent_ms is not None:
+                wait = min(wait, cls._POSE_SUB_ACK_TIMEOUT_MS - time.ticks_diff(now, cls._pose_sub_sent_ms))
+        return max(0, min(wait, cls._IDLE_MAX_MS))
 
     # -------- Internal helpers --------
 
     @classmethod
     def _wifi_ok(cls):
-        with cls._lock:
-            wlan = cls._wlan
+        wlan = cls._wlan
         if wlan is None:
             return False
         try:
@@ -369,6 +722,7 @@ class Enes193:
             return name, pw
 
         # 2) fallback to installed python mapping
+        from .wifi_db import WIFI_MAP
         tup = WIFI_MAP.get(mac_str.lower())
         if tup:
             return tup[0], tup[1]
@@ -376,7 +730,28 @@ class Enes193:
         return None, None
 
     @classmethod
-    def _wifi_connect(cls):
+    def _backoff_ms(cls, failures):
+        # Delay before retrying after `failures` failed attempts in a row
+        ms = min(cls._RECONNECT_MAX_MS, cls._RECONNECT_MIN_MS << min(failures - 1, 8))
+        return random.randint(ms // 2, ms)
+
+    @classmethod
+    def _wifi_connect(cls, reset=True):
+        for ms in cls._wifi_connect_steps(reset):
+            time.sleep_ms(ms)
+
+    @classmethod
+    async def _wifi_connect_async(cls, reset=True):
+        asyncio = load_asyncio()
+        for ms in cls._wifi_connect_steps(reset):
+            await asyncio.sleep_ms(ms)
+
+    @classmethod
+    def _wifi_connect_steps(cls, reset=True):
+        # Generator: yields how long to wait (ms) between steps, so the same
+        # sequence can be driven by time.sleep_ms or asyncio.sleep_ms.
+        # reset=False skips cycling the interface, for a quick rejoin after
+        # losing the access point. An existing association is always kept.
         wlan = network.WLAN(network.STA_IF)
 
         with cls._lock:
@@ -415,15 +790,21 @@ class Enes193:
             except Exception:
                 pass
 
-        # reset trick
-        try:
-            wlan.active(False)
-            time.sleep(0.5)
-        except Exception:
-            pass
+        if wlan.isconnected():
+            return
+
+        if reset:
+            # reset trick
+            try:
+                wlan.active(False)
+                yield 500
+            except Exception:
+                pass
 
-        wlan.active(True)
-        time.sleep(0.5)
+            wlan.active(True)
+            yield 500
+        else:
+            wlan.active(True)
 
         try:
             ap = network.WLAN(network.AP_IF)
@@ -446,15 +827,14 @@ class Enes193:
         while not wlan.isconnected():
             if time.time() - t0 > 25:
                 raise RuntimeError("WiFi connect timeout")
-            time.sleep(0.2)
+            yield 200
 
         if cls.DEBUG:
             print("[enes100] WiFi connected:", wlan.ifconfig())
 
     @classmethod
     def _ws_ok(cls):
-        with cls._lock:
-            return bool(cls._connected and (cls._ws is not None))
+        return bool(cls._connected and (cls._ws is not None))
 
     @classmethod
     def _ws_url(cls):
@@ -465,17 +845,60 @@ class Enes193:
             path = "/" + path
         return "ws://{}:{}{}".format(ip, cls.WS_PORT, path)
 
+    @classmethod
+    def _ws_target(cls):
+        # (URI, sockaddr) for the current room, parsed and resolved once
+        with cls._lock:
+            ip = cls._vision_ip
+        target = cls._ws_targets.get(ip)
+        if target is None:
+            from . import uwebsockets
+            uri = uwebsockets.urlparse(cls._ws_url())
+            target = (uri, uwebsockets.resolve(uri))
+            cls._ws_targets[ip] = target
+        return target
+
     @classmethod
     def _connect_ws_and_begin(cls):
+        from . import uwebsockets
+
         cls._drop_ws()
 
-        url = cls._ws_url()
+        uri, addr = cls._ws_target()
         if cls.DEBUG:
-            print("[enes100] WS connecting:", url)
+            print("[enes100] WS connecting:", uri)
+
+        try:
+            ws = uwebsockets.connect(uri, cls._WS_MAX_MESSAGE_SIZE, addr)
+        except Exception:
+            # Look the address up again next time in case it changed
+            cls._ws_targets.pop(cls._vision_ip, None)
+            raise
+        # The worker waits in ws.wait(); reads themselves never block.
+        ws.settimeout(0)
+
+        cls._start_session(ws)
 
-        ws = uwebsockets.connect(url)
-        ws.settimeout(cls._WS_RECV_TIMEOUT_S)
+    @classmethod
+    async def _connect_ws_and_begin_async(cls):
+        asyncio = load_asyncio()
+        from . import uwebsockets
 
+        cls._drop_ws()
+
+        uri = cls._ws_target()[0]
+        if cls.DEBUG:
+            print("[enes100] WS connecting:", uri)
+
+        ws = await uwebsockets.connect_async(uri, cls._WS_MAX_MESSAGE_SIZE)
+
+        cls._start_session(ws)
+        await ws.flush_async()
+        cls._reader_task = asyncio.create_task(cls._reader_async(ws))
+
+    @classmethod
+    def _start_session(cls, ws):
+        ws.keepalive(cls.KEEPALIVE_INTERVAL_MS, cls.KEEPALIVE_TIMEOUT_MS)
         with cls._lock:
             cls._ws = ws
 
@@ -484,11 +907,68 @@ class Enes193:
             "teamName": cls._team_name,
             "aruco": int(cls._marker_id),
             "teamType": cls._team_type,
+            "poseFormat": "binary" if cls.BINARY_POSE else "json",
         })
 
+        now = time.ticks_ms()
         with cls._lock:
             cls._connected = True
-            cls._missed_pongs = 0
+            # Poll for a pose on the first pass instead of a period later
+            cls._last_pose_req_ms = time.ticks_add(now, -cls._POSE_REQUEST_PERIOD_MS)
+            cls._pose_streaming = False
+            cls._pose_sub_sent_ms = None
+            cls._pose_sub_pending = cls._pose_sub_rate > 0
+            # Resend unacknowledged missions right away on the new connection
+            for m in cls._mission_pending:
+                m[5] = None
+
+    @classmethod
+    def _send_subscribe(cls, now):
+        with cls._lock:
+            rate = cls._pose_sub_rate
+            cls._pose_sub_pending = False
+            cls._pose_sub_sent_ms = now if rate > 0 else None
+            if rate == 0:
+                cls._pose_streaming = False
+        cls._ws_send({"op": "subscribe", "teamName": cls._team_name, "topic": "aruco", "rate": rate})
+
+    @classmethod
+    def _send_missions(cls, now):
+        # Sends pending missions that are new or due for a retry and returns
+        # how many ms until the next retry is due.
+        with cls._lock:
+            pending = list(cls._mission_pending)
+
+        wait = cls.MISSION_RETRY_MS
+        for m in pending:
+            if m[5] is not None:
+                left = cls.MISSION_RETRY_MS - time.ticks_diff(now, m[5])
+                if left > 0:
+                    wait = min(wait, left)
+                    continue
+
+            if m[4] >= cls.MISSION_MAX_TRIES:
+                # Never acknowledged: submit it the old way, as a print. It is
+                # sent here rather than queued, where a burst of print() calls
+                # could push it out. If the send fails it stays pending and
+                # goes out on the next connection.
+                cls._ws_send_raw(cls._msg_print_head, json.dumps(m[3]).encode(), b"}")
+                with cls._lock:
+                    cls._mission_pending.remove(m)
+                    cls._mission_status[m[0]] = False
+                continue
+
+            m[4] += 1
+            m[5] = now
+            cls._ws_send({
+                "op": "mission",
+                "teamName": cls._team_name,
+                "type": m[1],
+                "value": m[2],
+                "seq": m[0],
+                "message": m[3],
+            })
+        return wait
 
     @classmethod
     def _drop_ws(cls):
@@ -497,13 +977,34 @@ class Enes193:
             ws = cls._ws
             cls._ws = None
             cls._connected = False
-            cls._missed_pongs = 0
+            task = cls._reader_task
+            cls._reader_task = None
+        if task is not None:
+            task.cancel()
         if ws is not None:
             try:
                 ws.close()
             except Exception:
                 pass
 
+    @classmethod
+    def _build_templates(cls):
+        # Payloads for the steady-state messages, encoded once per begin()
+        # so the worker never re-serializes them. Print messages are spliced
+        # between _msg_print_head and a closing brace.
+        team = cls._team_name
+        cls._msg_pong = json.dumps({"op": "ping", "teamName": team, "status": "pong"}).encode()
+        cls._msg_aruco = json.dumps({"op": "aruco", "teamName": team}).encode()
+        cls._msg_print_head = ('{"op": "print", "teamName": ' + json.dumps(team) + ', "message": ').encode()
+
+    @classmethod
+    def _ws_send_raw(cls, data, *more):
+        # Send already-encoded JSON text; extra parts are appended in the frame
+        ws = cls._ws
+        if ws is None:
+            raise RuntimeError("ws not connected")
+        ws.write_frame(_OP_TEXT, data, *more)
+
     @classmethod
     def _ws_send(cls, obj):
         with cls._lock:
@@ -513,20 +1014,40 @@ class Enes193:
         ws.send(json.dumps(obj))
 
     @classmethod
-    def _ws_recv(cls):
-        with cls._lock:
-            ws = cls._ws
+    def _ws_drain(cls, timeout_ms):
+        # Wait up to timeout_ms for incoming data, then handle every message
+        # that is available without blocking again.
+        ws = cls._ws
         if ws is None:
-            return None
-        try:
-            return ws.recv()
-        except OSError:
-            return None
+            return
+        if not ws.wait(timeout_ms):
+            return
+
+        msg = ws.recv_view()
+        while msg:
+            cls._handle_message(msg[0], msg[1])
+            if not ws.open:
+                break
+            msg = ws.recv_view()
+
+        if not ws.open:
+            cls._drop_ws()
 
     @classmethod
-    def _handle_message(cls, msg):
+    def _handle_message(cls, opcode, payload):
+        # payload is a memoryview into the websocket's receive buffer; it is
+        # parsed in place and must not be kept.
+        # The server is talking to us, so the connection is good again.
+        cls._ws_failures = 0
+
+        if opcode == _OP_BYTES:
+            if len(payload) == cls._POSE_BIN_SIZE and payload[0] == cls._POSE_BIN_OP:
+                _, flags, _, x, y, t = struct.unpack_from(cls._POSE_BIN_FMT, payload)
+                cls._set_pose(x, y, t, bool(flags & 1))
+            return
+
         try:
-            data = json.loads(msg)
+            data = json.loads(payload)
         except Exception:
             return
 
@@ -541,38 +1062,66 @@ class Enes193:
             except Exception:
                 x, y, t, vis = -1.0, -1.0, -1.0, False
 
+            cls._set_pose(x, y, t, vis)
+
+        elif op == "subscribe":
+            # Ack for a subscribe request: status "ok" means poses will now
+            # be pushed; anything else keeps us polling.
+            status = str(data.get("status", "")).lower()
+            with cls._lock:
+                cls._pose_sub_sent_ms = None
+                cls._pose_streaming = (status == "ok" and cls._pose_sub_rate > 0)
+                cls._last_pose_ms = time.ticks_ms()
+
+        elif op == "mission":
+            # Ack for a mission submission. Anything but status "ok" means the
+            # server got it but rejected it, so it isn't resent either way.
+            try:
+                seq = int(data.get("seq", 0))
+            except Exception:
+                return
+            ok = str(data.get("status", "ok")).lower() == "ok"
             with cls._lock:
-                cls._x = x
-                cls._y = y
-                cls._theta = t
-                cls._visible = vis
+                for m in cls._mission_pending:
+                    if m[0] == seq:
+                        cls._mission_pending.remove(m)
+                        cls._mission_status[seq] = ok
+                        break
 
         elif op == "ping":
             status = str(data.get("status", "")).lower()
             if status == "ping":
                 try:
-                    cls._ws_send({"op": "ping", "teamName": cls._team_name, "status": "pong"})
+                    cls._ws_send_raw(cls._msg_pong)
                 except Exception:
                     cls._drop_ws()
-            elif status == "pong":
-                with cls._lock:
-                    cls._missed_pongs = 0
+
+    @classmethod
+    def _set_pose(cls, x, y, theta, visible):
+        now = time.ticks_ms()
+        with cls._lock:
+            cls._pose_hist.add(x, y, theta, visible, now)
+        cls._pose = (x, y, theta, visible, now, cls._pose[5] + 1)
+        cls._last_pose_ms = now
+
+        ev = cls._pose_event
+        if ev is not None:
+            ev.set()
 
     @classmethod
     def _flush_print_queue(cls):
-        to_send = None
+        # Everything queued goes out as one print message, one line per
+        # print() call, so the vision system shows the same lines as before
+        # but it costs a single frame.
         with cls._lock:
             if cls._ws is None or not cls._connected or not cls._print_queue:
                 return
-            n = 3 if len(cls._print_queue) > 3 else len(cls._print_queue)
-            to_send = cls._print_queue[:n]
-            del cls._print_queue[:n]
+            to_send = cls._print_queue.pop_all()
 
-        for s in to_send:
-            try:
-                cls._ws_send({"op": "print", "teamName": cls._team_name, "message": s})
-            except Exception:
-                cls._drop_ws()
-                return
+        text = to_send[0] if len(to_send) == 1 else "\n".join(to_send)
+        try:
+            cls._ws_send_raw(cls._msg_print_head, json.dumps(text).encode(), b"}")
+        except Exception:
+            cls._drop_ws()
 
 
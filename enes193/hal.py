@@ -0,0 +1,37 @@
+# hal.py
+# Everything that differs between the robot and a PC, picked once at import
+# time. On MicroPython these are the real modules; anywhere else (CPython)
+# they come from sim.py, so the whole package (websocket framing, the
+# Enes193 worker, mission formatting, tank control) can be imported, tested
+# and profiled on a Linux box with no hardware attached.
+#
+# The rest of the package imports time, json, socket, network, _thread and
+# the machine classes from here instead of directly, and gets uasyncio from
+# load_asyncio().
+
+import sys
+
+SIMULATED = sys.implementation.name != "micropython"
+
+if SIMULATED:
+    import _thread
+    from .sim import const, time, json, socket, network
+    from .sim import Pin, PWM, Timer, time_pulse_us
+else:
+    from micropython import const
+    import time
+    import json
+    import socket
+    import network
+    import _thread
+    from machine import Pin, PWM, Timer, time_pulse_us
+
+
+def load_asyncio():
+    # Only the asyncio API needs uasyncio, so it is imported on first use
+    # rather than with everything else
+    if SIMULATED:
+        from .sim import asyncio
+    else:
+        import uasyncio as asyncio
+    return asyncio
@@ -93,20 +93,108 @@ BLUE = 4
 # Internal helpers
 # ----------------------------
 
+_QMARKS = "?????"
+
 def _norm_mission_name(name):
     # Accept lower/upper/Title-case etc.
     if name is None:
         return ""
     return str(name).strip().upper()
 
-def _qmarks():
-    return "?????"
-
 def _wrap(sentence):
     # Mimic Vision System mission formatting style
     # (Mission submissions in VS typically show "MISSION MESSAGE: ...")
     return "MISSION MESSAGE: " + sentence
 
+# ----------------------------
+# Message table
+# ----------------------------
+
+# (mission, type) -> (sentence, labels)
+# labels maps each valid value to the text put into the sentence; None means
+# the value itself is printed as an integer. Values missing from labels print
+# as question marks.
+MESSAGES = {
+    ("CRASH", DIRECTION): ("The direction of the abnormality is in the {} direction.", {
+        PLUS_X: "+x",
+        MINUS_X: "-x",
+        PLUS_Y: "+y",
+        MINUS_Y: "-y",
+    }),
+    ("CRASH", LENGTH): ("The length of the side with abnormality is {}mm.", None),
+    ("CRASH", HEIGHT): ("The height of the side with abnormality is {}mm.", None),
+
+    ("DATA", CYCLE): ("The duty cycle is {}%.", None),
+    ("DATA", MAGNETISM): ("The disk is {}.", {
+        MAGNETIC: "MAGNETIC",
+        NOT_MAGNETIC: "NOT MAGNETIC",
+    }),
+
+    ("MATERIAL", WEIGHT): ("The weight of the material is {}.", {
+        HEAVY: "HEAVY",
+        MEDIUM: "MEDIUM",
+        LIGHT: "LIGHT",
+    }),
+    # FOAM/PLASTIC calls, but the mission text is SQUISHY / NOT SQUISHY
+    ("MATERIAL", MATERIAL_TYPE): ("The material is {}.", {
+        FOAM: "SQUISHY",
+        PLASTIC: "NOT SQUISHY",
+    }),
+
+    ("FIRE", NUM_CANDLES): ("The number of candles lit is {}.", None),
+    ("FIRE", TOPOGRAPHY): ("The topography of the fire mission is:  {}", {
+        TOP_A: "A",
+        TOP_B: "B",
+        TOP_C: "C",
+    }),
+
+    ("WATER", DEPTH): ("The depth of the water is {}mm.", None),
+    ("WATER", WATER_TYPE): ("The water is {}.", {
+        FRESH_UNPOLLUTED: "FRESH and UNPOLLUTED",
+        FRESH_POLLUTED: "FRESH and POLLUTED",
+        SALTY_UNPOLLUTED: "SALTY and UNPOLLUTED",
+        SALTY_POLLUTED: "SALTY and POLLUTED",
+    }),
+
+    ("SEED", LOCATION): ("The far plots are {} plantable substrate.", {
+        BOTH: "BOTH",
+        NEITHER: "NEITHER",
+        ADJACENT: "ADJACENT",
+        DIAGONAL: "DIAGONAL",
+    }),
+
+    ("HYDROGEN", VOLTAGE_OUTPUT): ("The voltage output is {}.", {
+        VOLTAGE_1: "1 VOLT",
+        VOLTAGE_2: "2 VOLTS",
+        VOLTAGE_3: "3 VOLTS",
+        VOLTAGE_4: "4 VOLTS",
+        VOLTAGE_5: "5 VOLTS",
+    }),
+    ("HYDROGEN", LED_COLOR): ("The LED color is {}.", {
+        WHITE: "WHITE",
+        RED: "RED",
+        YELLOW: "YELLOW",
+        GREEN: "GREEN",
+        BLUE: "BLUE",
+    }),
+}
+
+# Sentence used when a mission gets a type it doesn't have
+FALLBACKS = {
+    "CRASH": "The direction of the abnormality is in the {} direction.",
+    "DATA": "The disk is {}.",
+    "MATERIAL": "The material is {}.",
+    "FIRE": "The topography of the fire mission is:  {}",
+    "WATER": "The water is {}.",
+    "SEED": "The far plots are {} plantable substrate.",
+    "HYDROGEN": "The LED color is {}.",
+}
+
+_ALIASES = {
+    "CRASH_SITE": "CRASH",
+    "CRASHSITE": "CRASH",
+}
+
 # ----------------------------
 # Mission formatter core
 # ----------------------------
@@ -114,9 +202,35 @@ def _wrap(sentence):
 class MissionFormatter:
     def __init__(self):
         self._mission = ""  # normalized uppercase
+        self._msgs = {}
+        self._fallback = None
 
     def set_mission(self, mission_name):
+        """
+        Pre-render every message for the mission. Each type maps to either a
+        dict of value -> finished message (plus a fallback for bad values)
+        or, for numeric types, a wrapped sentence with one {} left to fill.
+        """
         self._mission = _norm_mission_name(mission_name)
+        key = _ALIASES.get(self._mission, self._mission)
+
+        self._msgs = {}
+        if key in FALLBACKS:
+            for (mission, mtype), (sentence, labels) in MESSAGES.items():
+                if mission != key:
+                    continue
+                if labels is None:
+                    self._msgs[mtype] = _wrap(sentence)
+                else:
+                    rendered = {}
+                    for value, label in labels.items():
+                        rendered[value] = _wrap(sentence.format(label))
+                    self._msgs[mtype] = (rendered, _wrap(sentence.format(_QMARKS)))
+            self._fallback = _wrap(FALLBACKS[key].format(_QMARKS))
+        elif self._mission:
+            self._fallback = _wrap("Unknown mission '{}'.".format(self._mission))
+        else:
+            self._fallback = None
 
     def get_mission(self):
         return self._mission
@@ -127,155 +241,15 @@ class MissionFormatter:
         msg: int (second arg) but we accept anything convertible
         print_func: callable(str) -> bool (Enes100.print)
         """
-        mission = self._mission
-
-        # If mission isn't set, still print something obvious
-        if not mission:
-            s = _wrap("Mission is not set. Got type={} message={}.".format(mtype, msg))
-            return print_func(s)
-
-        # Route by mission name
-        if mission in ("CRASH", "CRASH_SITE", "CRASHSITE"):
-            out = self._crash(mtype, msg)
-        elif mission == "DATA":
-            out = self._data(mtype, msg)
-        elif mission == "MATERIAL":
-            out = self._material(mtype, msg)
-        elif mission == "FIRE":
-            out = self._fire(mtype, msg)
-        elif mission == "WATER":
-            out = self._water(mtype, msg)
-        elif mission == "SEED":
-            out = self._seed(mtype, msg)
-        elif mission == "HYDROGEN":
-            out = self._hydrogen(mtype, msg)
-        else:
-            out = _wrap("Unknown mission '{}'.".format(mission))
-
-        return print_func(out)
-
-    # ---- Per-mission implementations ----
-
-    def _crash(self, mtype, msg):
-        if mtype == DIRECTION:
-            dirmap = {
-                PLUS_X: "+x",
-                MINUS_X: "-x",
-                PLUS_Y: "+y",
-                MINUS_Y: "-y",
-            }
-            direction = dirmap.get(int(msg), _qmarks())
-            return _wrap("The direction of the abnormality is in the {} direction.".format(direction))
-
-        if mtype == LENGTH:
-            return _wrap("The length of the side with abnormality is {}mm.".format(int(msg)))
-
-        if mtype == HEIGHT:
-            return _wrap("The height of the side with abnormality is {}mm.".format(int(msg)))
-
-        return _wrap("The direction of the abnormality is in the {} direction.".format(_qmarks()))
-
-    def _data(self, mtype, msg):
-        if mtype == CYCLE:
-            return _wrap("The duty cycle is {}%.".format(int(msg)))
-
-        if mtype == MAGNETISM:
-            magmap = {
-                MAGNETIC: "MAGNETIC",
-                NOT_MAGNETIC: "NOT MAGNETIC",
-            }
-            m = magmap.get(int(msg), _qmarks())
-            if m == _qmarks():
-                return _wrap("The disk is {}.".format(m))
-            return _wrap("The disk is {}.".format(m))
-
-        return _wrap("The disk is {}.".format(_qmarks()))
-
-    def _material(self, mtype, msg):
-        if mtype == WEIGHT:
-            wmap = {
-                HEAVY: "HEAVY",
-                MEDIUM: "MEDIUM",
-                LIGHT: "LIGHT",
-            }
-            w = wmap.get(int(msg), _qmarks())
-            return _wrap("The weight of the material is {}.".format(w))
-
-        if mtype == MATERIAL_TYPE:
-            # You asked for FOAM/PLASTIC calls but mission text is SQUISHY / NOT SQUISHY
-            tmap = {
-                FOAM: "SQUISHY",
-                PLASTIC: "NOT SQUISHY",
-            }
-            t = tmap.get(int(msg), _qmarks())
-            if t == "SQUISHY":
-                return _wrap("The material is SQUISHY.")
-            if t == "NOT SQUISHY":
-                return _wrap("The material is NOT SQUISHY.")
-            return _wrap("The material is {}.".format(_qmarks()))
-
-        return _wrap("The material is {}.".format(_qmarks()))
-
-    def _fire(self, mtype, msg):
-        if mtype == NUM_CANDLES:
-            return _wrap("The number of candles lit is {}.".format(int(msg)))
-
-        if mtype == TOPOGRAPHY:
-            tmap = {TOP_A: "A", TOP_B: "B", TOP_C: "C"}
-            t = tmap.get(int(msg), _qmarks())
-            return _wrap("The topography of the fire mission is:  {}".format(t))
-
-        return _wrap("The topography of the fire mission is:  {}".format(_qmarks()))
-
-    def _water(self, mtype, msg):
-        if mtype == DEPTH:
-            return _wrap("The depth of the water is {}mm.".format(int(msg)))
-
-        if mtype == WATER_TYPE:
-            wmap = {
-                FRESH_UNPOLLUTED: "FRESH and UNPOLLUTED",
-                FRESH_POLLUTED: "FRESH and POLLUTED",
-                SALTY_UNPOLLUTED: "SALTY and UNPOLLUTED",
-                SALTY_POLLUTED: "SALTY and POLLUTED",
-            }
-            w = wmap.get(int(msg), _qmarks())
-            if w == _qmarks():
-                return _wrap("The water is {}.".format(_qmarks()))
-            return _wrap("The water is {}.".format(w))
-
-        return _wrap("The water is {}.".format(_qmarks()))
-
-    def _seed(self, mtype, msg):
-        if mtype == LOCATION:
-            pmap = {
-                BOTH: "BOTH",
-                NEITHER: "NEITHER",
-                ADJACENT: "ADJACENT",
-                DIAGONAL: "DIAGONAL",
-            }
-            p = pmap.get(int(msg), _qmarks())
-            return _wrap("The far plots are {} plantable substrate.".format(p))
-
-        return _wrap("The far plots are {} plantable substrate.".format(_qmarks()))
-
-    def _hydrogen(self, mtype, msg):
-        if mtype == VOLTAGE_OUTPUT:
-            v = int(msg)
-            if v in (1, 2, 3, 4, 5):
-                return _wrap("The voltage output is {} VOLT{}.".format(v, "" if v == 1 else "S"))
-            return _wrap("The voltage output is {}.".format(_qmarks()))
-
-        if mtype == LED_COLOR:
-            cmap = {
-                WHITE: "WHITE",
-                RED: "RED",
-                YELLOW: "YELLOW",
-                GREEN: "GREEN",
-                BLUE: "BLUE",
-            }
-            c = cmap.get(int(msg), _qmarks())
-            return _wrap("The LED color is {}.".format(c))
-
-        return _wrap("The LED color is {}.".format(_qmarks()))
+        entry = self._msgs.get(mtype)
+
+        if entry is None:
+            # If mission isn't set, still print something obvious
+            if self._fallback is None:
+                return print_func(_wrap("Mission is not set. Got type={} message={}.".format(mtype, msg)))
+            return print_func(self._fallback)
 
+        if isinstance(entry, str):
+            return print_func(entry.format(int(msg)))
 
+        return print_func(entry[0].get(int(msg), entry[1]))
@@ -0,0 +1,68 @@
+# msgqueue.py
+# Fixed-capacity FIFO of strings backing Enes193.print(). The slot list is
+# allocated once; push and pop are O(1) and never shift or reallocate it.
+
+# What to do when a message doesn't fit
+DROP_OLDEST = 0   # make room by discarding the oldest queued messages
+DROP_NEWEST = 1   # discard the new message
+BLOCK = 2         # wait for the worker to make room (handled by the caller)
+
+
+class MessageQueue:
+    def __init__(self, slots=32, max_bytes=2048):
+        self._items = [None] * slots
+        self._slots = slots
+        self._head = 0    # index of the oldest message
+        self._count = 0
+        self._bytes = 0
+        self.max_bytes = max_bytes
+        self.dropped = 0
+
+    def __len__(self):
+        return self._count
+
+    def fits(self, n):
+        return self._count < self._slots and self._bytes + n <= self.max_bytes
+
+    def push(self, s, policy=DROP_OLDEST):
+        """
+        Queue s. Returns False (and counts a drop) if it was discarded.
+        BLOCK behaves like DROP_NEWEST here; waiting is up to the caller.
+        """
+        n = len(s)
+        if n > self.max_bytes:
+            self.dropped += 1
+            return False
+
+        if not self.fits(n):
+            if policy != DROP_OLDEST:
+                self.dropped += 1
+                return False
+            while not self.fits(n):
+                self.pop()
+                self.dropped += 1
+
+        i = self._head + self._count
+        if i >= self._slots:
+            i -= self._slots
+        self._items[i] = s
+        self._count += 1
+        self._bytes += n
+        return True
+
+    def pop(self):
+        """Remove and return the oldest message (None if empty)."""
+        if not self._count:
+            return None
+        i = self._head
+        s = self._items[i]
+        self._items[i] = None
+        i += 1
+        self._head = 0 if i == self._slots else i
+        self._count -= 1
+        self._bytes -= len(s)
+        return s
+
+    def pop_all(self):
+        """Remove and return every queued message, oldest first."""
+        return [self.pop() for _ in range(self._count)]
@@ -0,0 +1,208 @@
+# pose.py
+# MicroPython-friendly pose bookkeeping: a fixed-size, array-backed history of
+# ArUco samples. Memory is allocated once; adding a sample allocates nothing.
+
+import math
+from array import array
+
+from .hal import time
+
+
+def wrap_angle(a):
+    # Wrap an angle in radians to [-pi, pi]
+    while a > math.pi:
+        a -= 2 * math.pi
+    while a < -math.pi:
+        a += 2 * math.pi
+    return a
+
+
+class PoseHistory:
+    def __init__(self, size=32):
+        self._size = size
+        self._x = array('f', [0.0] * size)
+        self._y = array('f', [0.0] * size)
+        self._theta = array('f', [0.0] * size)
+        self._t = array('i', [0] * size)   # time.ticks_ms() of each sample
+        self._vis = bytearray(size)
+        self._head = 0   # slot the next sample goes into
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def clear(self):
+        self._head = 0
+        self._count = 0
+
+    def add(self, x, y, theta, visible, t_ms):
+        i = self._head
+        self._x[i] = x
+        self._y[i] = y
+        self._theta[i] = theta
+        self._t[i] = t_ms
+        self._vis[i] = 1 if visible else 0
+
+        i += 1
+        self._head = 0 if i == self._size else i
+        if self._count < self._size:
+            self._count += 1
+
+    def get(self, k):
+        """
+        k-th newest sample (0 = newest) as (x, y, theta, visible, ticks_ms).
+        """
+        i = self._slot(k)
+        return (self._x[i], self._y[i], self._theta[i], bool(self._vis[i]), self._t[i])
+
+    def latest(self, n):
+        """Up to n samples, newest first."""
+        return [self.get(k) for k in range(min(n, self._count))]
+
+    def at(self, t_ms):
+        """
+        Pose at time t_ms (a time.ticks_ms() value), linearly interpolated
+        between the two samples around it. Times outside the history clamp
+        to the oldest/newest sample. Interpolation never mixes a visible and
+        an invisible sample; the nearer one is returned instead.
+        Returns None if the history is empty.
+        """
+        if not self._count:
+            return None
+
+        # Walk from newest to oldest looking for the first sample at or
+        # before t_ms.
+        newer = -1
+        for k in range(self._count):
+            i = self._slot(k)
+            dt = time.ticks_diff(t_ms, self._t[i])
+            if dt >= 0:
+                break
+            newer = i
+        else:
+            # t_ms is older than everything we have
+            return self.get(self._count - 1)
+
+        if newer < 0 or dt == 0:
+            return self.get(k)
+
+        span = time.ticks_diff(self._t[newer], self._t[i])
+        if span <= 0:
+            return self.get(k)
+
+        if not (self._vis[i] and self._vis[newer]):
+            return self.get(k if 2 * dt <= span else k - 1)
+
+        f = dt / span
+        x = self._x[i] + f * (self._x[newer] - self._x[i])
+        y = self._y[i] + f * (self._y[newer] - self._y[i])
+        th0 = self._theta[i]
+        theta = wrap_angle(th0 + f * wrap_angle(self._theta[newer] - th0))
+        return (x, y, theta, True, t_ms)
+
+    def _slot(self, k):
+        i = self._head - 1 - k
+        if i < 0:
+            i += self._size
+        return i
+
+
+class PosePredictor:
+    """
+    Dead-reckoning pose estimate for the tank.
+
+    Motor commands (recorded by tank.set_left_PWM/set_right_PWM) drive a
+    differential-drive model between vision updates, and each new vision
+    sample pulls the estimate back with a complementary filter. The model
+    constants are rough defaults; calibrate them for your robot.
+    """
+
+    SPEED_PER_PWM = 0.3 / 1023   # m/s of track speed per PWM count
+    PWM_DEADBAND = 80            # |PWM| below this does not move the tank
+    TRACK_WIDTH = 0.15           # m between the left and right tracks
+    GAIN = 0.6                   # weight of a vision sample (0..1)
+    MAX_COAST_MS = 2000          # give up this long after the last vision fix
+
+    def __init__(self):
+        self._left = 0
+        self._right = 0
+        self._x = 0.0
+        self._y = 0.0
+        self._theta = 0.0
+        self._t = time.ticks_ms()   # time the state above refers to
+        self._fix_t = 0             # time of the last vision fix used
+        self._seq = 0               # seq of the last vision sample seen
+        self._valid = False
+
+    def command(self, left=None, right=None):
+        # Integrate up to now with the old command before switching
+        self._advance(time.ticks_ms())
+        if left is not None:
+            self._left = left
+        if right is not None:
+            self._right = right
+
+    def correct(self, pose):
+        """Blend in a vision sample: (x, y, theta, visible, ticks_ms, seq)."""
+        x, y, theta, visible, t, seq = pose
+        if seq == self._seq:
+            return
+        self._seq = seq
+        if not visible:
+            return
+
+        now = time.ticks_ms()
+        self._advance(now)
+
+        # The sample is a little old; carry it forward to now with the
+        # current command so it is comparable with the estimate.
+        v, w = self._velocity()
+        x, y, theta = _integrate(x, y, theta, v, w, time.ticks_diff(now, t) / 1000)
+
+        if not self._valid or time.ticks_diff(now, self._fix_t) > self.MAX_COAST_MS:
+            self._x, self._y, self._theta = x, y, theta
+        else:
+            g = self.GAIN
+            self._x += g * (x - self._x)
+            self._y += g * (y - self._y)
+            self._theta = wrap_angle(self._theta + g * wrap_angle(theta - self._theta))
+
+        self._fix_t = t
+        self._valid = True
+
+    def predict(self):
+        """Current estimate as (x, y, theta, valid)."""
+        now = time.ticks_ms()
+        self._advance(now)
+        if not self._valid or time.ticks_diff(now, self._fix_t) > self.MAX_COAST_MS:
+            return (-1.0, -1.0, -1.0, False)
+        return (self._x, self._y, self._theta, True)
+
+    def _advance(self, now):
+        dt = time.ticks_diff(now, self._t) / 1000
+        self._t = now
+        if self._valid and dt > 0:
+            v, w = self._velocity()
+            self._x, self._y, self._theta = _integrate(self._x, self._y, self._theta, v, w, dt)
+
+    def _velocity(self):
+        vl = self._speed(self._left)
+        vr = self._speed(self._right)
+        return (vl + vr) / 2, (vr - vl) / self.TRACK_WIDTH
+
+    def _speed(self, pwm):
+        if -self.PWM_DEADBAND < pwm < self.PWM_DEADBAND:
+            return 0.0
+        return pwm * self.SPEED_PER_PWM
+
+
+def _integrate(x, y, theta, v, w, dt):
+    # Midpoint heading keeps arcs reasonable for the short steps we take
+    mid = theta + w * dt / 2
+    return (x + v * math.cos(mid) * dt,
+            y + v * math.sin(mid) * dt,
+            wrap_angle(theta + w * dt))
+
+
+# Shared by tank (motor commands) and Enes193 (vision samples)
+predictor = PosePredictor()
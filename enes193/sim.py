@@ -0,0 +1,396 @@
+# sim.py
+# CPython stand-ins for the MicroPython modules that hal.py hands out.
+# Timing is real (wall clock) and sockets are the host's, so Enes193 can talk
+# to a vision system server running on the same machine. The robot itself is
+# simulated: motors and the servo just remember their settings, and the
+# ultrasonic sensor answers every trigger with an echo echo_us long.
+
+import json as _json
+import socket as _socket
+import threading
+import time as _time
+
+
+def const(x):
+    return x
+
+
+# ----------------------------
+# time
+# ----------------------------
+
+class _Time:
+    # ticks wrap around like they do on the ESP32
+    _PERIOD = 1 << 30
+
+    def __init__(self):
+        self._t0 = _time.monotonic()
+
+    def ticks_ms(self):
+        return int((_time.monotonic() - self._t0) * 1000) & (self._PERIOD - 1)
+
+    def ticks_us(self):
+        return int((_time.monotonic() - self._t0) * 1000000) & (self._PERIOD - 1)
+
+    def ticks_add(self, ticks, delta):
+        return (ticks + delta) & (self._PERIOD - 1)
+
+    def ticks_diff(self, a, b):
+        half = self._PERIOD // 2
+        return ((a - b + half) & (self._PERIOD - 1)) - half
+
+    def sleep(self, s):
+        _time.sleep(s)
+
+    def sleep_ms(self, ms):
+        _time.sleep(ms / 1000)
+
+    def sleep_us(self, us):
+        _time.sleep(us / 1000000)
+
+    def time(self):
+        return int(_time.time())
+
+
+time = _Time()
+
+
+# ----------------------------
+# json
+# ----------------------------
+
+class _Json:
+    def dumps(self, obj):
+        return _json.dumps(obj)
+
+    def loads(self, s):
+        # MicroPython parses bytes and memoryviews directly
+        if not isinstance(s, str):
+            s = bytes(s)
+        return _json.loads(s)
+
+
+json = _Json()
+
+
+# ----------------------------
+# socket
+# ----------------------------
+
+class Socket:
+    # MicroPython's socket interface on top of a CPython socket: readinto()
+    # and write() return None instead of raising when they would block.
+    def __init__(self, sock):
+        self._sock = sock
+
+    def connect(self, addr):
+        self._sock.connect(addr)
+
+    def fileno(self):
+        return self._sock.fileno()
+
+    def setblocking(self, flag):
+        self._sock.setblocking(flag)
+
+    def settimeout(self, timeout):
+        self._sock.settimeout(timeout)
+
+    def readinto(self, buf):
+        try:
+            return self._sock.recv_into(buf)
+        except BlockingIOError:
+            return None
+
+    def write(self, buf):
+        try:
+            return self._sock.send(buf)
+        except BlockingIOError:
+            return None
+
+    def close(self):
+        self._sock.close()
+
+
+class _SocketModule:
+    def socket(self, *args):
+        return Socket(_socket.socket(*args))
+
+    def getaddrinfo(self, host, port, *args):
+        return _socket.getaddrinfo(host, port, *args)
+
+
+socket = _SocketModule()
+
+
+# ----------------------------
+# uasyncio
+# ----------------------------
+
+def _loop():
+    import asyncio
+    return asyncio.get_running_loop()
+
+
+class Stream:
+    # uasyncio.Stream on a sim Socket: reads wait in the event loop, writes
+    # are buffered until drain()
+    def __init__(self, s):
+        self.s = s
+        self._out = bytearray()
+
+    async def readinto(self, buf):
+        return await _loop().sock_recv_into(self.s._sock, buf)
+
+    def write(self, buf):
+        self._out += buf
+
+    async def drain(self):
+        if self._out:
+            data, self._out = self._out, bytearray()
+            await _loop().sock_sendall(self.s._sock, data)
+
+    def close(self):
+        self.s.close()
+
+    async def wait_closed(self):
+        pass
+
+
+class _Asyncio:
+    # The parts of uasyncio the package uses, on top of CPython's asyncio.
+    # Like uasyncio on the robot, that is only imported once it is used.
+    StreamReader = StreamWriter = Stream
+
+    def __getattr__(self, name):
+        # run, create_task, sleep, wait_for, Event, TimeoutError, ...
+        import asyncio
+        return getattr(asyncio, name)
+
+    def sleep_ms(self, ms):
+        return self.sleep(ms / 1000)
+
+    def wait_for_ms(self, aw, timeout):
+        return self.wait_for(aw, timeout / 1000)
+
+    async def open_connection(self, host, port, ssl=False):
+        if ssl:
+            raise OSError("no TLS in the simulator")
+        sock = _socket.socket()
+        sock.setblocking(False)
+        try:
+            await _loop().sock_connect(sock, _socket.getaddrinfo(host, port)[0][4])
+        except BaseException:
+            sock.close()
+            raise
+        stream = Stream(Socket(sock))
+        return stream, stream
+
+
+asyncio = _Asyncio()
+
+
+# ----------------------------
+# network
+# ----------------------------
+
+class _WLAN:
+    # Joins instantly. disconnect() simulates losing the access point.
+    def __init__(self, net):
+        self._net = net
+        self._active = False
+        self._connected = False
+        self._hostname = None
+
+    def active(self, flag=None):
+        if flag is None:
+            return self._active
+        self._active = bool(flag)
+        if not flag:
+            self._connected = False
+
+    def config(self, *args, **kwargs):
+        if "dhcp_hostname" in kwargs:
+            self._hostname = kwargs["dhcp_hostname"]
+        if args == ("mac",):
+            return self._net.mac
+        return None
+
+    def connect(self, ssid=None, key=None):
+        if self._active:
+            self._connected = True
+
+    def disconnect(self):
+        self._connected = False
+
+    def isconnected(self):
+        return self._connected
+
+    def ifconfig(self):
+        return ("127.0.0.1", "255.0.0.0", "127.0.0.1", "127.0.0.1")
+
+
+class _Network:
+    STA_IF = 0
+    AP_IF = 1
+
+    # MAC of the simulated station interface. Enes193 looks it up in
+    # wifi_db, so add it there or set Enes193.REQUIRE_KNOWN_MAC = False.
+    mac = b"\x02\x00\x00\x00\x00\x01"
+
+    def __init__(self):
+        self._ifaces = {}
+
+    def WLAN(self, interface=STA_IF):
+        wlan = self._ifaces.get(interface)
+        if wlan is None:
+            wlan = self._ifaces[interface] = _WLAN(self)
+        return wlan
+
+
+network = _Network()
+
+
+# ----------------------------
+# machine
+# ----------------------------
+
+# Simulated HC-SR04 on the tank's pins: a falling edge on TRIG_PIN produces
+# an echo pulse echo_us long on ECHO_PIN. None means nothing is in range.
+TRIG_PIN = 5
+ECHO_PIN = 16
+echo_us = 580   # about 10 cm
+
+_pins = {}
+
+
+class Pin:
+    IN = 1
+    OUT = 3
+    IRQ_RISING = 1
+    IRQ_FALLING = 2
+
+    def __init__(self, id, mode=-1):
+        self.id = id
+        self._value = 0
+        self._handler = None
+        self._trigger = 0
+        _pins[id] = self
+
+    def value(self, v=None):
+        if v is None:
+            return self._value
+        falling = self._value and not v
+        self._value = 1 if v else 0
+        if falling and self.id == TRIG_PIN:
+            _echo()
+
+    def on(self):
+        self.value(1)
+
+    def off(self):
+        self.value(0)
+
+    def irq(self, handler=None, trigger=IRQ_RISING | IRQ_FALLING, hard=False):
+        self._handler = handler
+        self._trigger = trigger
+
+    def _drive(self, v):
+        # Set by the simulation, firing the interrupt handler like an edge
+        self._value = v
+        h = self._handler
+        if h is not None and self._trigger & (self.IRQ_RISING if v else self.IRQ_FALLING):
+            h(self)
+
+
+def _echo():
+    pin = _pins.get(ECHO_PIN)
+    width = echo_us
+    if pin is None or pin._handler is None or width is None:
+        return
+
+    def pulse():
+        pin._drive(1)
+        # sleep() alone overshoots by a good fraction of a short echo, so
+        # the last stretch is spun out
+        end = _time.monotonic() + width / 1000000
+        _time.sleep(max(0, width - 300) / 1000000)
+        while _time.monotonic() < end:
+            pass
+        pin._drive(0)
+
+    threading.Thread(target=pulse, daemon=True).start()
+
+
+def time_pulse_us(pin, pulse_level, timeout_us=1000000):
+    width = echo_us if pin.id == ECHO_PIN else None
+    if width is None:
+        _time.sleep(timeout_us / 1000000)
+        return -2
+    if width > timeout_us:
+        _time.sleep(timeout_us / 1000000)
+        return -1
+    _time.sleep(width / 1000000)
+    return width
+
+
+class PWM:
+    def __init__(self, pin, freq=0, duty=0):
+        self.pin = pin
+        self._freq = freq
+        self._duty = duty
+        self._duty_u16 = duty * 64
+
+    def freq(self, f=None):
+        if f is None:
+            return self._freq
+        self._freq = f
+
+    def duty(self, d=None):
+        if d is None:
+            return self._duty
+        self._duty = d
+        self._duty_u16 = d * 64
+
+    def duty_u16(self, d=None):
+        if d is None:
+            return self._duty_u16
+        self._duty_u16 = d
+        self._duty = d >> 6
+
+    def deinit(self):
+        pass
+
+
+class Timer:
+    # Callbacks run on a background thread, much like soft interrupts
+    ONE_SHOT = 0
+    PERIODIC = 1
+
+    def __init__(self, id=-1, **kwargs):
+        self._gen = 0
+        if kwargs:
+            self.init(**kwargs)
+
+    def init(self, mode=PERIODIC, period=-1, callback=None, freq=None):
+        self.deinit()
+        if freq is not None:
+            period = 1000 / freq
+        gen = self._gen
+
+        def run():
+            due = _time.monotonic()
+            while self._gen == gen:
+                due += period / 1000
+                wait = due - _time.monotonic()
+                if wait > 0:
+                    _time.sleep(wait)
+                if self._gen != gen:
+                    break
+                callback(self)
+                if mode == Timer.ONE_SHOT:
+                    break
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def deinit(self):
+        self._gen += 1
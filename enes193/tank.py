@@ -1,8 +1,57 @@
-from machine import Pin, PWM, time_pulse_us
-import time
+from array import array
+
+from .hal import Pin, PWM, Timer, time_pulse_us, time
+from .pose import predictor as _predictor
+
+
+def _check_method(method):
+    if method != "median" and method != "trimmed_mean":
+        raise ValueError("method must be 'median' or 'trimmed_mean'")
+
+
+def _filtered_cm(widths, method="median"):
+    # Echo widths (us, 0 = no echo) -> (distance in cm, number of valid
+    # widths). Timeouts are dropped; "trimmed_mean" also drops the top and
+    # bottom quarter before averaging.
+    _check_method(method)
+    widths = sorted(w for w in widths if w > 0)
+    n = len(widths)
+    if not n:
+        return -1, 0
+    if method == "median":
+        us = widths[n // 2]
+    else:
+        k = n // 4
+        kept = widths[k:n - k]
+        us = sum(kept) / len(kept)
+    return (us / 2) / 29.1, n
+
 
 class tank:
+    # Time from one trigger to the next in read_distance(). The sensor
+    # needs 60 ms or more for the last ping's echoes to die out.
+    SAMPLE_PERIOD_MS = 60
+
     def __init__(self):
+        # Background ranging (start_ranging). The echo interrupt handler
+        # only writes these preallocated fields, so it never allocates.
+        self._timer = None
+        self._rise_us = 0
+        self._waiting = False     # pulse sent, echo not finished yet
+        self._hist = array('i', [0] * 5)   # echo widths in us, 0 = no echo
+        self._hist_i = 0
+        self._hist_n = 0
+        self._pins_ready = False
+
+    def _ensure_pins(self):
+        # The pins are set up by the first method that needs them rather
+        # than at import, so "import enes193" in a vision-only script leaves
+        # the motors and servo alone.
+        if not self._pins_ready:
+            self._pins_ready = True
+            self.__setup_pins()
+
+    def __setup_pins(self):
         # Motor Control Pins
         self.pwma = PWM(Pin(14), freq=1000)  # A = Right motors
         self.pwmb = PWM(Pin(13), freq=1000)  # B = Left motors
@@ -23,25 +72,98 @@ class tank:
         
 
     def set_right_PWM(self, speed):
+        self._ensure_pins()
         self.ain1.value(1 if speed > 0 else 0)
         self.pwma.duty(min(abs(speed), 1023))
+        _predictor.command(right=max(-1023, min(speed, 1023)))
 
     def set_left_PWM(self, speed):
+        self._ensure_pins()
         self.bin1.value(1 if speed > 0 else 0)
         self.pwmb.duty(min(abs(speed), 1023))
+        _predictor.command(left=max(-1023, min(speed, 1023)))
 
     def turn_off_motors(self):
+        self._ensure_pins()
         self.pwma.duty(0)
         self.pwmb.duty(0)
+        _predictor.command(0, 0)
         
     def read_distance_sensor(self):
+        if self._timer is not None:
+            # Background ranging owns the sensor; use its latest reading
+            return self.get_distance()
+        self._ensure_pins()
         pulse_time = self.__send_pulse()
         cms = (pulse_time / 2) / 29.1
         if cms < 0:
             return -1
         return cms
+
+    def start_ranging(self, period_ms=60, history=5, timer_id=0):
+        """
+        Measure distance in the background: a timer pulses the sensor every
+        period_ms and pin interrupts time the echo, so nothing blocks the
+        caller. get_distance() returns the median of the last `history`
+        readings. Keep period_ms at 60 or more so echoes don't overlap.
+        """
+        self._ensure_pins()
+        self.stop_ranging()
+        self._hist = array('i', [0] * history)
+        self._hist_i = 0
+        self._hist_n = 0
+        self._waiting = False
+        self.echo.irq(self.__on_echo, Pin.IRQ_RISING | Pin.IRQ_FALLING, hard=True)
+        self._timer = Timer(timer_id)
+        self._timer.init(period=period_ms, mode=Timer.PERIODIC, callback=self.__on_tick)
+
+    def stop_ranging(self):
+        if self._timer is None:
+            return
+        self._timer.deinit()
+        self._timer = None
+        self.echo.irq(handler=None)
+
+    def get_distance(self):
+        """
+        Median distance in centimeters over the recent background readings,
+        without waiting for the sensor. Starts background ranging on first
+        use. Returns -1 if there is no reading yet or nothing is in range.
+        """
+        if self._timer is None:
+            self.start_ranging()
+        return _filtered_cm(self._hist[:self._hist_n])[0]
+
+    def read_distance(self, samples=5, method="median"):
+        """
+        Take `samples` readings and combine them, ignoring readings with no
+        echo. method is "median" or "trimmed_mean". Returns (distance in cm,
+        number of valid readings); distance is -1 if none were valid.
+        With background ranging running it uses the latest readings from
+        there instead of waiting for new ones.
+        """
+        _check_method(method)
+        if self._timer is not None:
+            n = min(samples, self._hist_n)
+            widths = [self._hist[(self._hist_i - 1 - k) % len(self._hist)] for k in range(n)]
+            return _filtered_cm(widths, method)
+
+        self._ensure_pins()
+        widths = array('i', [0] * samples)
+        sent = 0
+        for k in range(samples):
+            if k:
+                # Counted from the last trigger, not from when its echo
+                # ended (that can be anywhere up to 30 ms later)
+                wait = self.SAMPLE_PERIOD_MS - time.ticks_diff(time.ticks_ms(), sent)
+                if wait > 0:
+                    time.sleep_ms(wait)
+            sent = time.ticks_ms()
+            widths[k] = self.__pulse_width()
+        return _filtered_cm(widths, method)
     
     def set_servo(self, angle):
+        self._ensure_pins()
         duty = self.__angle_to_duty(angle)
         self.servo1.duty_u16(duty)
     
@@ -55,6 +177,44 @@ class tank:
         duty = int(pulse_us * 65535 / 20000)
         return duty
     
+    def __on_tick(self, timer):
+        if self._waiting:
+            # The last pulse never came back: out of range
+            self.__record(0)
+        self._waiting = True
+        self._rise_us = 0
+        self.trig.value(1)
+        time.sleep_us(10)
+        self.trig.value(0)
+
+    def __on_echo(self, pin):
+        # Hard interrupt: timestamp the edge and do nothing else
+        t = time.ticks_us()
+        if pin.value():
+            self._rise_us = t
+        elif self._waiting and self._rise_us:
+            self._waiting = False
+            w = time.ticks_diff(t, self._rise_us)
+            # Same 30 ms limit as read_distance_sensor; longer is out of range
+            self.__record(w if w <= 30000 else 0)
+
+    def __record(self, width_us):
+        i = self._hist_i
+        self._hist[i] = width_us
+        i += 1
+        self._hist_i = 0 if i == len(self._hist) else i
+        if self._hist_n < len(self._hist):
+            self._hist_n += 1
+
+    def __pulse_width(self):
+        # Echo width in us, 0 if it never came back (time_pulse_us returns
+        # a negative value or raises on timeout, depending on the port)
+        try:
+            w = self.__send_pulse()
+        except OSError:
+            return 0
+        return w if w > 0 else 0
+
     def __send_pulse(self):    
         self.trig.value(0) # Stabilize the sensor
         time.sleep_us(5)
@@ -0,0 +1,43 @@
+# telemetry.py
+# On-device aggregation for Enes193.log(). Numeric samples are folded into
+# per-key last/min/max/sum/count and turned into one compact line per window,
+# instead of formatting and sending every reading.
+
+
+class Telemetry:
+    def __init__(self):
+        # key -> [last, min, max, sum, count]; lists are reused across windows
+        self._stats = {}
+
+    def add(self, key, value):
+        st = self._stats.get(key)
+        if st is None:
+            self._stats[key] = [value, value, value, value, 1]
+        elif not st[4]:
+            st[0] = st[1] = st[2] = st[3] = value
+            st[4] = 1
+        else:
+            st[0] = value
+            if value < st[1]:
+                st[1] = value
+            if value > st[2]:
+                st[2] = value
+            st[3] += value
+            st[4] += 1
+
+    def take(self):
+        """
+        Summary of the current window as one line, then start a new window.
+        Returns None if nothing was logged.
+        """
+        parts = []
+        for key, st in self._stats.items():
+            n = st[4]
+            if not n:
+                continue
+            parts.append("{}={:g} ({:g}..{:g} avg {:g} n{})".format(
+                key, st[0], st[1], st[2], st[3] / n, n))
+            st[4] = 0
+        if not parts:
+            return None
+        return "LOG " + "; ".join(parts)
@@ -3,11 +3,14 @@ Websockets protocol
 """
 
 # import logging
-import ure as re
-import ustruct as struct
-import urandom as random
-import usocket as socket
-from ucollections import namedtuple
+import re
+import struct
+import random
+import select
+import errno
+from collections import namedtuple
+
+from .hal import const, socket, time, load_asyncio
 
 # LOGGER = logging.getLogger(__name__)
 
@@ -30,6 +33,19 @@ CLOSE_TOO_BIG = const(1009)
 CLOSE_MISSING_EXTN = const(1010)
 CLOSE_BAD_CONDITION = const(1011)
 
+# Initial sizes of the per-connection frame buffers (grown on demand)
+WRITE_BUF_SIZE = const(256)
+READ_BUF_SIZE = const(512)
+
+# Default upper bound on a (possibly fragmented) incoming message
+MAX_MESSAGE_SIZE = const(8192)
+
+# How long connect() waits for the server's handshake response
+HANDSHAKE_TIMEOUT_MS = const(5000)
+
+# How long a write may wait for room in the socket's send buffer
+WRITE_TIMEOUT_MS = const(5000)
+
 URL_RE = re.compile(r'(wss|ws)://([A-Za-z0-9-\.]+)(?:\:([0-9]+))?(/.+)?')
 URI = namedtuple('URI', ('protocol', 'hostname', 'port', 'path'))
 
@@ -60,6 +76,35 @@ def urlparse(uri):
         return URI(protocol, host, int(port), path)
 
 
+def _mask(buf, start, end):
+    """
+    XOR buf[start:end] in place with the 4-byte masking key stored just
+    before it, in buf[start - 4:start], where it sits in the frame.
+
+    Works on single bytes held in locals, so it allocates nothing (unpacking
+    32-bit words would create a tuple and, on MicroPython, a big int for
+    every word).
+    """
+    k0 = buf[start - 4]
+    k1 = buf[start - 3]
+    k2 = buf[start - 2]
+    k3 = buf[start - 1]
+    i = start
+    words = end - ((end - start) & 3)
+    while i < words:
+        buf[i] ^= k0
+        buf[i + 1] ^= k1
+        buf[i + 2] ^= k2
+        buf[i + 3] ^= k3
+        i += 4
+    if i < end:
+        buf[i] ^= k0
+        if i + 1 < end:
+            buf[i + 1] ^= k1
+            if i + 2 < end:
+                buf[i + 2] ^= k2
+
+
 class Websocket:
     """
     Basis of the Websocket protocol.
@@ -69,9 +114,46 @@ class Websocket:
     """
     is_client = False
 
-    def __init__(self, sock):
+    def __init__(self, sock, max_message_size=MAX_MESSAGE_SIZE):
         self.sock = sock
         self.open = True
+        self.max_message_size = max_message_size
+        self._wbuf = bytearray(WRITE_BUF_SIZE)
+        self._wmv = memoryview(self._wbuf)
+
+        # Receive buffer: bytes in [_rstart, _rend) have been read from the
+        # socket but not yet consumed as frames.
+        self._rbuf = bytearray(READ_BUF_SIZE)
+        self._rmv = memoryview(self._rbuf)
+        self._rstart = 0
+        self._rend = 0
+        self._hlen = 0
+        self._plen = 0   # payload length of the head frame, 0 until known
+
+        # Reassembly of fragmented messages. The buffer is allocated at
+        # max_message_size the first time a fragmented message arrives and
+        # reused afterwards.
+        self._mbuf = None
+        self._mmv = None
+        self._mlen = 0
+        self._mopcode = None
+
+        # The socket is driven non-blocking; timeouts are applied with poll.
+        self._timeout_ms = -1
+        self._poller = select.poll()
+        self._poller.register(sock, select.POLLIN)
+        sock.setblocking(False)
+
+        # uasyncio stream wrapping sock, created on first async use
+        self._stream = None
+
+        # Keepalive pings (see keepalive()); off until configured
+        self._ka_interval = 0
+        self._ka_timeout = 0
+        self._ping_ms = 0        # when the unanswered ping was sent
+        self._ping_out = False
+        self._rx_ms = 0          # when data last arrived from the peer
+        self.rtt_ms = -1         # round trip of the last answered ping
 
     def __enter__(self):
         return self
@@ -80,61 +162,296 @@ class Websocket:
         self.close()
 
     def settimeout(self, timeout):
-        self.sock.settimeout(timeout)
+        """Set the read timeout in seconds (None blocks, 0 never waits)."""
+        self._timeout_ms = -1 if timeout is None else int(timeout * 1000)
+
+    def keepalive(self, interval_ms, timeout_ms=None):
+        """
+        Send a ping control frame every interval_ms and consider the peer
+        dead if a ping goes unanswered, with nothing else arriving, for
+        timeout_ms (default: interval_ms). Each pong updates rtt_ms.
+        check_keepalive() does the work and must be called regularly.
+        interval_ms=0 turns keepalive off.
+        """
+        self._ka_interval = interval_ms
+        self._ka_timeout = interval_ms if timeout_ms is None else timeout_ms
+        self._ping_out = False
+        self._ping_ms = self._rx_ms = time.ticks_ms()
+
+    def check_keepalive(self):
+        """
+        Send a keepalive ping if one is due. Closes the connection and raises
+        ConnectionClosed if the peer has stopped answering. Returns how many
+        ms until it should be called again, or -1 if keepalive is off.
+        """
+        if not self._ka_interval:
+            return -1
+
+        now = time.ticks_ms()
+        since_ping = time.ticks_diff(now, self._ping_ms)
+        if self._ping_out:
+            left = self._ka_timeout - min(since_ping, time.ticks_diff(now, self._rx_ms))
+            if left <= 0:
+                self._close()
+                raise ConnectionClosed('keepalive timeout')
+            return left
+
+        if since_ping < self._ka_interval:
+            return self._ka_interval - since_ping
+
+        # The payload is the send time, so a pong can be matched to its ping
+        self.write_frame(OP_PING, struct.pack('<I', now & 0xffffffff))
+        self._ping_ms = now
+        self._ping_out = True
+        return min(self._ka_interval, self._ka_timeout)
+
+    def any(self):
+        """Return True if a complete frame is already buffered."""
+        return self._rend - self._rstart >= self._frame_size()
+
+    def wait(self, timeout_ms=-1):
+        """
+        Sleep until there is something to read (a buffered frame or socket
+        activity) or timeout_ms expires. Returns False on timeout.
+        """
+        if self.any():
+            return True
+        return self._wait(select.POLLIN, timeout_ms)
 
     def read_frame(self, max_size=None):
         """
         Read a frame from the socket.
         See https://tools.ietf.org/html/rfc6455#section-5.2 for the details.
-        """
-
-        # Frame header
-        two_bytes = self.sock.read(2)
 
-        if not two_bytes:
-            raise NoDataException
+        Socket data is pulled into a reusable receive buffer, so a single
+        read may deliver several frames. The payload is returned as a
+        memoryview into that buffer (unmasked in place) and is only valid
+        until the next read.
+        """
+        while True:
+            size = self._frame_size()
+            # Checked before anything else so the limit doesn't depend on
+            # how the frame was split across reads
+            if max_size is not None and self._plen > max_size:
+                self.close(code=CLOSE_TOO_BIG)
+                return True, OP_CLOSE, None
+            if self._rend - self._rstart >= size:
+                return self._take_frame(size)
+            try:
+                self._make_room(size)
+            except MemoryError:
+                # We can't receive this many bytes, close the socket
+                # if __debug__: LOGGER.debug("Frame of length %s too big. Closing" length)
+                self.close(code=CLOSE_TOO_BIG)
+                return True, OP_CLOSE, None
+            if not self._fill():
+                raise NoDataException
+
+    async def read_frame_async(self, max_size=None):
+        """asyncio version of read_frame(); waits for data instead of timing out."""
+        while True:
+            size = self._frame_size()
+            # Checked before anything else so the limit doesn't depend on
+            # how the frame was split across reads
+            if max_size is not None and self._plen > max_size:
+                self.close(code=CLOSE_TOO_BIG)
+                return True, OP_CLOSE, None
+            if self._rend - self._rstart >= size:
+                return self._take_frame(size)
+            try:
+                self._make_room(size)
+            except MemoryError:
+                self.close(code=CLOSE_TOO_BIG)
+                return True, OP_CLOSE, None
+            n = await self._stream_get().readinto(self._rmv[self._rend:])
+            if n is not None:
+                self._got(n)
+
+    def _frame_size(self):
+        """
+        Total size of the frame at the head of the receive buffer, or the
+        number of bytes needed to parse its header if that is incomplete.
+        Also sets _hlen and _plen (the payload length, 0 while unknown).
+        """
+        buf = self._rbuf
+        s = self._rstart
+        avail = self._rend - s
+        self._plen = 0
+        if avail < 2:
+            return 2
+
+        byte2 = buf[s + 1]
+        length = byte2 & 0x7f
+        hlen = 2
 
-        byte1, byte2 = struct.unpack('!BB', two_bytes)
+        if length == 126:  # Magic number, length header is 2 bytes
+            hlen = 4
+            if avail < hlen:
+                return hlen
+            length, = struct.unpack_from('!H', buf, s + 2)
+        elif length == 127:  # Magic number, length header is 8 bytes
+            hlen = 10
+            if avail < hlen:
+                return hlen
+            length, = struct.unpack_from('!Q', buf, s + 2)
+
+        if byte2 & 0x80:
+            hlen += 4
+
+        self._hlen = hlen
+        self._plen = length
+        return hlen + length
+
+    def _take_frame(self, size):
+        # Consume the complete frame at the head of the receive buffer
+        buf = self._rbuf
+        s = self._rstart
+        start = s + self._hlen
+        end = s + size
+        self._rstart = end
 
         # Byte 1: FIN(1) _(1) _(1) _(1) OPCODE(4)
+        byte1 = buf[s]
         fin = bool(byte1 & 0x80)
         opcode = byte1 & 0x0f
 
         # Byte 2: MASK(1) LENGTH(7)
-        mask = bool(byte2 & (1 << 7))
-        length = byte2 & 0x7f
-
-        if length == 126:  # Magic number, length header is 2 bytes
-            length, = struct.unpack('!H', self.sock.read(2))
-        elif length == 127:  # Magic number, length header is 8 bytes
-            length, = struct.unpack('!Q', self.sock.read(8))
+        if buf[s + 1] & 0x80:  # Mask is the 4 bytes before the payload
+            _mask(buf, start, end)
 
-        if mask:  # Mask is 4 bytes
-            mask_bits = self.sock.read(4)
+        return fin, opcode, self._rmv[start:end]
 
+    def _take_head(self):
+        """
+        Consume and return the HTTP response head at the front of the receive
+        buffer, without the blank line that ends it. Returns None, after
+        making room for more data, if it hasn't all arrived yet. Whatever the
+        server sent after the head stays buffered as websocket data.
+        """
+        data = bytes(self._rmv[self._rstart:self._rend])
+        i = data.find(b'\r\n\r\n')
+        if i >= 0:
+            self._rstart += i + 4
+            return data[:i]
+        n = len(data)
+        if self._rend == len(self._rbuf):
+            if n >= self.max_message_size:
+                raise ConnectionClosed('response head too long')
+            self._make_room(2 * n)
+        return None
+
+    def _read_head(self, timeout_ms):
+        timeout, self._timeout_ms = self._timeout_ms, timeout_ms
         try:
-            data = self.sock.read(length)
-        except MemoryError:
-            # We can't receive this many bytes, close the socket
-            # if __debug__: LOGGER.debug("Frame of length %s too big. Closing" length)
-            self.close(code=CLOSE_TOO_BIG)
-            return True, OP_CLOSE, None
-
-        if mask:
-            data = bytes(b ^ mask_bits[i % 4]
-                         for i, b in enumerate(data))
+            head = self._take_head()
+            while head is None:
+                if not self._fill():
+                    raise OSError(errno.ETIMEDOUT)
+                head = self._take_head()
+            return head
+        finally:
+            self._timeout_ms = timeout
+
+    async def _read_head_async(self):
+        head = self._take_head()
+        while head is None:
+            n = await self._stream_get().readinto(self._rmv[self._rend:])
+            if n is not None:
+                self._got(n)
+            head = self._take_head()
+        return head
+
+    def _make_room(self, size):
+        """
+        Make sure a frame of `size` bytes fits in the receive buffer from
+        _rstart, moving the partial frame to the front or growing the buffer.
+        """
+        buf = self._rbuf
+        s = self._rstart
+        e = self._rend
+        if s == e:
+            s = e = 0
+
+        if s + size > len(buf):
+            n = e - s
+            if size > len(buf):
+                buf = bytearray(size)
+                buf[:n] = self._rmv[s:e]
+                self._rbuf = buf
+                self._rmv = memoryview(buf)
+            elif n:
+                buf[:n] = self._rmv[s:e] if s >= n else bytes(self._rmv[s:e])
+            s, e = 0, n
+
+        self._rstart = s
+        self._rend = e
+
+    def _fill(self):
+        """
+        Read whatever the socket has into the receive buffer. Returns False
+        if nothing arrived within the read timeout.
+        """
+        mv = self._rmv[self._rend:]
+        n = self.sock.readinto(mv)
+        if n is None:
+            if not self._wait(select.POLLIN, self._timeout_ms):
+                return False
+            n = self.sock.readinto(mv)
+            if n is None:
+                return False
+        self._got(n)
+        return True
+
+    def _got(self, n):
+        if not n:
+            # EOF: the peer went away without a close frame
+            self._close()
+            raise ConnectionClosed()
+        self._rend += n
+        self._rx_ms = time.ticks_ms()
+
+    def _wait(self, event, timeout_ms):
+        self._poller.modify(self.sock, event)
+        return bool(self._poller.poll(timeout_ms))
+
+    def _write(self, buf):
+        if self._stream is not None:
+            # asyncio mode: never block. Whatever the socket can't take right
+            # now is kept by the stream until flush_async() drains it.
+            self._stream.write(buf)
+            return
+        while len(buf):
+            n = self.sock.write(buf)
+            if n is None:
+                if not self._wait(select.POLLOUT, WRITE_TIMEOUT_MS):
+                    raise OSError(errno.ETIMEDOUT)
+                continue
+            if n == len(buf):
+                break   # the usual case; don't slice off an empty view
+            buf = buf[n:]
 
-        return fin, opcode, data
+    def _stream_get(self):
+        if self._stream is None:
+            asyncio = load_asyncio()
+            self._stream = asyncio.StreamReader(self.sock)
+        return self._stream
 
-    def write_frame(self, opcode, data=b''):
+    def write_frame(self, opcode, data=b'', *more):
         """
         Write a frame to the socket.
         See https://tools.ietf.org/html/rfc6455#section-5.2 for the details.
+
+        The whole frame (header, mask and payload) is assembled in a reusable
+        scratch buffer and handed to the socket in a single write. Any extra
+        buffers in `more` are appended to the payload, so a message can be
+        spliced into a prebuilt template without joining it first.
         """
         fin = True
         mask = self.is_client  # messages sent by client are masked
 
         length = len(data)
+        for part in more:
+            length += len(part)
 
         # Frame header
         # Byte 1: FIN(1) _(1) _(1) _(1) OPCODE(4)
@@ -145,28 +462,43 @@ class Websocket:
         byte2 = 0x80 if mask else 0
 
         if length < 126:  # 126 is magic value to use 2-byte length header
-            byte2 |= length
-            self.sock.write(struct.pack('!BB', byte1, byte2))
-
+            hlen = 2
         elif length < (1 << 16):  # Length fits in 2-bytes
-            byte2 |= 126  # Magic code
-            self.sock.write(struct.pack('!BBH', byte1, byte2, length))
-
+            hlen = 4
         elif length < (1 << 64):
-            byte2 |= 127  # Magic code
-            self.sock.write(struct.pack('!BBQ', byte1, byte2, length))
-
+            hlen = 10
         else:
             raise ValueError()
 
-        if mask:  # Mask is 4 bytes
-            mask_bits = struct.pack('!I', random.getrandbits(32))
-            self.sock.write(mask_bits)
+        start = hlen + 4 if mask else hlen  # Mask is 4 bytes
+        total = start + length
+
+        buf = self._wbuf
+        if total > len(buf):
+            buf = self._wbuf = bytearray(total)
+            self._wmv = memoryview(buf)
+        mv = self._wmv
+
+        if hlen == 2:
+            struct.pack_into('!BB', buf, 0, byte1, byte2 | length)
+        elif hlen == 4:
+            struct.pack_into('!BBH', buf, 0, byte1, byte2 | 126, length)
+        else:
+            struct.pack_into('!BBQ', buf, 0, byte1, byte2 | 127, length)
+
+        end = start + len(data)
+        mv[start:end] = data
+        for part in more:
+            n = end + len(part)
+            mv[end:n] = part
+            end = n
 
-            data = bytes(b ^ mask_bits[i % 4]
-                         for i, b in enumerate(data))
+        if mask:
+            # Two 16-bit halves stay small ints on MicroPython
+            struct.pack_into('<HH', buf, hlen, random.getrandbits(16), random.getrandbits(16))
+            _mask(buf, start, total)
 
-        self.sock.write(data)
+        self._write(mv[:total])
 
     def recv(self):
         """
@@ -177,42 +509,117 @@ class Websocket:
         If you don't call recv() sufficiently often you won't process control
         frames.
         """
+        msg = self.recv_view()
+        if msg is None:
+            return '' if self.open else None
+
+        opcode, data = msg
+        if opcode == OP_TEXT:
+            return str(data, 'utf-8')
+        return bytes(data)
+
+    def recv_view(self):
+        """
+        Receive a data frame without copying its payload.
+
+        Returns (opcode, payload) where payload is a memoryview into the
+        receive buffer, valid only until the next call that reads from this
+        websocket. Returns None if nothing arrived within the timeout or the
+        connection was closed.
+        """
         assert self.open
 
         while self.open:
             try:
-                fin, opcode, data = self.read_frame()
+                fin, opcode, data = self.read_frame(self.max_message_size)
             except NoDataException:
-                return ''
+                return None
             except ValueError:
                 # LOGGER.debug("Failed to read frame. Socket dead.")
                 self._close()
                 raise ConnectionClosed()
 
-            if not fin:
-                raise NotImplementedError()
+            msg = self._on_frame(fin, opcode, data)
+            if msg is not None:
+                return msg
 
-            if opcode == OP_TEXT:
-                return data.decode('utf-8')
-            elif opcode == OP_BYTES:
-                return data
-            elif opcode == OP_CLOSE:
+    async def recv_view_async(self):
+        """
+        asyncio version of recv_view(). Waits until a message arrives and
+        returns None once the connection is closed.
+        """
+        assert self.open
+
+        while self.open:
+            try:
+                fin, opcode, data = await self.read_frame_async(self.max_message_size)
+            except ValueError:
                 self._close()
-                return
-            elif opcode == OP_PONG:
-                # Ignore this frame, keep waiting for a data frame
-                continue
-            elif opcode == OP_PING:
-                # We need to send a pong frame
-                # if __debug__: LOGGER.debug("Sending PONG")
-                self.write_frame(OP_PONG, data)
-                # And then wait to receive
-                continue
-            elif opcode == OP_CONT:
-                # This is a continuation of a previous frame
-                raise NotImplementedError(opcode)
-            else:
-                raise ValueError(opcode)
+                raise ConnectionClosed()
+
+            msg = self._on_frame(fin, opcode, data)
+            if msg is not None:
+                return msg
+
+    async def flush_async(self):
+        """Wait until everything written in asyncio mode has reached the socket."""
+        await self._stream_get().drain()
+
+    def _on_frame(self, fin, opcode, data):
+        # Returns (opcode, payload) once a data message is complete, None if
+        # the frame was a control frame or only part of a message.
+        if opcode == OP_TEXT or opcode == OP_BYTES:
+            if self._mopcode is not None:
+                # New message started before the last one finished
+                self._fail(CLOSE_PROTOCOL_ERROR)
+            if fin:
+                return opcode, data
+            # First fragment of a fragmented message
+            self._mopcode = opcode
+            self._mlen = 0
+            self._append(data)
+        elif opcode == OP_CLOSE:
+            self._close()
+        elif opcode == OP_PONG:
+            # Answer to a keepalive ping; anything else is ignored
+            if (self._ping_out and len(data) == 4
+                    and struct.unpack('<I', data)[0] == self._ping_ms & 0xffffffff):
+                self._ping_out = False
+                self.rtt_ms = time.ticks_diff(time.ticks_ms(), self._ping_ms)
+        elif opcode == OP_PING:
+            # We need to send a pong frame
+            # if __debug__: LOGGER.debug("Sending PONG")
+            self.write_frame(OP_PONG, data)
+        elif opcode == OP_CONT:
+            # This is a continuation of a previous frame
+            if self._mopcode is None:
+                self._fail(CLOSE_PROTOCOL_ERROR)
+            self._append(data)
+            if fin:
+                opcode = self._mopcode
+                self._mopcode = None
+                return opcode, self._mmv[:self._mlen]
+        else:
+            raise ValueError(opcode)
+        return None
+
+    def _append(self, data):
+        end = self._mlen + len(data)
+        if end > self.max_message_size:
+            self._fail(CLOSE_TOO_BIG)
+        if self._mbuf is None:
+            try:
+                self._mbuf = bytearray(self.max_message_size)
+            except MemoryError:
+                self._fail(CLOSE_TOO_BIG)
+            self._mmv = memoryview(self._mbuf)
+        self._mmv[self._mlen:end] = data
+        self._mlen = end
+
+    def _fail(self, code):
+        self._mopcode = None
+        self.close(code=code)
+        raise ConnectionClosed()
 
     def send(self, buf):
         """Send data to the websocket."""
@@ -236,8 +643,11 @@ class Websocket:
 
         buf = struct.pack('!H', code) + reason.encode('utf-8')
 
-        self.write_frame(OP_CLOSE, buf)
-        self._close()
+        try:
+            self.write_frame(OP_CLOSE, buf)
+        finally:
+            # The peer may already be gone; the socket is closed regardless
+            self._close()
 
     def _close(self):
         # if __debug__: LOGGER.debug("Connection closed")
@@ -252,9 +662,8 @@ https://github.com/aaugustin/websockets/blob/master/websockets/client.py
 """
 
 # import logging
-import usocket as socket
-import ubinascii as binascii
-import urandom as random
+import binascii
+import hashlib
 import ssl
 
 # LOGGER = logging.getLogger(__name__)
@@ -263,56 +672,122 @@ import ssl
 class WebsocketClient(Websocket):
     is_client = True
 
-def connect(uri):
+def resolve(uri):
+    """Socket address for a parsed URI, as passed to socket.connect()."""
+    return socket.getaddrinfo(uri.hostname, uri.port)[0][4]
+
+def connect(uri, max_message_size=MAX_MESSAGE_SIZE, addr=None):
     """
     Connect a websocket.
+
+    uri is a ws:// URL or a URI already returned by urlparse(). addr is the
+    server's socket address from resolve(); pass it when reconnecting to the
+    same server to skip the lookup.
     """
 
-    uri = urlparse(uri)
+    if isinstance(uri, str):
+        uri = urlparse(uri)
     assert uri
 
     # if __debug__: LOGGER.debug("open connection %s:%s", uri.hostname, uri.port)
 
-    sock = socket.socket()
-    addr = socket.getaddrinfo(uri.hostname, uri.port)
-    sock.connect(addr[0][4])
-    if uri.protocol == 'wss':
-        sock = ssl.wrap_socket(sock, server_hostname=uri.hostname)
-
-    def send_header(header, *args):
-        # if __debug__: LOGGER.debug(str(header), *args)
-        sock.write(header % args + '\r\n')
+    if addr is None:
+        addr = resolve(uri)
 
+    sock = socket.socket()
+    try:
+        sock.connect(addr)
+        if uri.protocol == 'wss':
+            sock = ssl.wrap_socket(sock, server_hostname=uri.hostname)
+    except Exception:
+        # A refused connection still holds one of the few sockets lwIP has
+        sock.close()
+        raise
+
+    # The handshake goes through the websocket's own buffers: the request is
+    # sent in one write, and the response is read in bulk, so frames the
+    # server sends straight after it are already buffered.
+    ws = WebsocketClient(sock, max_message_size)
+    key = _handshake_key()
+    try:
+        ws._write(_handshake_request(uri, key))
+        _check_response(ws._read_head(HANDSHAKE_TIMEOUT_MS), key)
+    except Exception:
+        ws._close()
+        raise
+
+    return ws
+
+
+def _handshake_key():
     # Sec-WebSocket-Key is 16 bytes of random base64 encoded
-    key = binascii.b2a_base64(bytes(random.getrandbits(8)
-                                    for _ in range(16)))[:-1]
+    return binascii.b2a_base64(bytes(random.getrandbits(8)
+                                     for _ in range(16)))[:-1]
 
-    send_header(b'GET %s HTTP/1.1', uri.path or '/')
-    send_header(b'Host: %s:%s', uri.hostname, uri.port)
-    send_header(b'Connection: Upgrade')
-    send_header(b'Upgrade: websocket')
-    send_header(b'Sec-WebSocket-Key: %s', key)
-    send_header(b'Sec-WebSocket-Version: 13')
-    send_header(b'Origin: http://{hostname}:{port}'.format(
-        hostname=uri.hostname,
-        port=uri.port)
-    )
-    send_header(b'')
 
-    header = sock.readline()[:-2]
-    assert header.startswith(b'HTTP/1.1 101 '), header
+def _accept_key(key):
+    """The Sec-WebSocket-Accept value a server must answer key with."""
+    h = hashlib.sha1(key + b'258EAFA5-E914-47DA-95CA-C5AB0DC85B11')
+    return binascii.b2a_base64(h.digest())[:-1].decode()
 
-    # We don't (currently) need these headers
-    # FIXME: should we check the return key?
-    while header:
-        # if __debug__: LOGGER.debug(str(header))
-        header = sock.readline()[:-2]
 
-    return WebsocketClient(sock)
+def _check_response(head, key):
+    """Raise ConnectionClosed unless head accepts the upgrade for key."""
+    lines = head.decode().split('\r\n')
+    if not lines[0].startswith('HTTP/1.1 101 '):
+        raise ConnectionClosed(lines[0])
 
+    for line in lines[1:]:
+        name, _, value = line.partition(':')
+        if name.strip().lower() == 'sec-websocket-accept':
+            if value.strip() != _accept_key(key):
+                raise ConnectionClosed('bad Sec-WebSocket-Accept')
+            return
+    raise ConnectionClosed('no Sec-WebSocket-Accept')
 
 
+def _handshake_request(uri, key):
+    """HTTP upgrade request for uri as a single bytes object."""
+    return (
+        'GET {path} HTTP/1.1\r\n'
+        'Host: {host}:{port}\r\n'
+        'Connection: Upgrade\r\n'
+        'Upgrade: websocket\r\n'
+        'Sec-WebSocket-Key: {key}\r\n'
+        'Sec-WebSocket-Version: 13\r\n'
+        'Origin: http://{host}:{port}\r\n'
+        '\r\n'
+    ).format(path=uri.path or '/', host=uri.hostname, port=uri.port,
+             key=key.decode()).encode()
 
 
+async def connect_async(uri, max_message_size=MAX_MESSAGE_SIZE):
+    """
+    Connect a websocket from a uasyncio task.
 
+    uri is a ws:// URL or a URI already returned by urlparse(). The returned
+    websocket is meant to be used through recv_view_async(); sends never
+    block and are pushed out by flush_async().
+    """
+    asyncio = load_asyncio()
+
+    if isinstance(uri, str):
+        uri = urlparse(uri)
+    assert uri
 
+    stream, _ = await asyncio.open_connection(
+        uri.hostname, uri.port, ssl=(uri.protocol == 'wss'))
+
+    ws = WebsocketClient(stream.s, max_message_size)
+    ws._stream = stream
+    key = _handshake_key()
+    try:
+        ws._write(_handshake_request(uri, key))
+        await stream.drain()
+        head = await asyncio.wait_for_ms(ws._read_head_async(), HANDSHAKE_TIMEOUT_MS)
+        _check_response(head, key)
+    except Exception:
+        ws._close()
+        raise
+
+    return ws
@@ -0,0 +1,23 @@
+# Freezes the enes193 package into MicroPython firmware, so it is imported
+# from flash as precompiled bytecode instead of being compiled at every boot.
+# From the MicroPython ports/esp32 directory:
+#   make BOARD=ESP32_GENERIC FROZEN_MANIFEST=/path/to/this/manifest.py
+
+include("$(PORT_DIR)/boards/manifest.py")
+
+# sim.py and example.py never run on the robot (see MPY_EXCLUDE in setup.py)
+package(
+    "enes193",
+    files=(
+        "__init__.py",
+        "Enes193.py",
+        "hal.py",
+        "mission.py",
+        "msgqueue.py",
+        "pose.py",
+        "tank.py",
+        "telemetry.py",
+        "uwebsockets.py",
+        "wifi_db.py",
+    ),
+)
@@ -1,4 +1,48 @@
-from setuptools import setup, find_packages
+import os
+import subprocess
+
+from setuptools import setup, find_packages, Command
+
+# Modules that never run on the robot and are left out of .mpy/frozen builds
+MPY_EXCLUDE = ("sim.py", "example.py")
+
+
+class build_mpy(Command):
+    """Precompile the package to MicroPython bytecode with mpy-cross."""
+
+    description = "compile enes193 to .mpy files with mpy-cross"
+    user_options = [
+        ("build-dir=", "d", "output directory (default: build/mpy)"),
+        ("mpy-cross=", None, "mpy-cross executable (default: mpy-cross)"),
+        ("opt=", "O", "mpy-cross optimisation level"),
+    ]
+
+    def initialize_options(self):
+        self.build_dir = None
+        self.mpy_cross = None
+        self.opt = None
+
+    def finalize_options(self):
+        if self.build_dir is None:
+            self.build_dir = os.path.join("build", "mpy")
+        if self.mpy_cross is None:
+            self.mpy_cross = "mpy-cross"
+
+    def run(self):
+        out_dir = os.path.join(self.build_dir, "enes193")
+        self.mkpath(out_dir)
+        for name in sorted(os.listdir("enes193")):
+            if not name.endswith(".py") or name in MPY_EXCLUDE:
+                continue
+            src = os.path.join("enes193", name)
+            dst = os.path.join(out_dir, name[:-3] + ".mpy")
+            cmd = [self.mpy_cross, "-s", "enes193/" + name, "-o", dst]
+            if self.opt is not None:
+                cmd.append("-O" + str(self.opt))
+            cmd.append(src)
+            self.announce(" ".join(cmd), level=2)
+            subprocess.check_call(cmd)
+
 
 setup(
     name="enes193",  # Package name
@@ -14,4 +58,5 @@ setup(
         "Topic :: Communications",
     ],
     keywords="MicroPython ESP32 WebSocket ENES193",
-)
\ No newline at end of file
+    cmdclass={"build_mpy": build_mpy},
+)
@@ -0,0 +1,113 @@
+# Startup cost of each way into the package: time to import it and the heap
+# it takes, each entry point in a fresh interpreter so nothing is already
+# loaded.
+#
+#   alloc B   heap allocated during the import with the collector off, i.e.
+#             the high-water mark compiling and running it needs
+#   kept B    what is still allocated after a collection
+#
+# Under the Unix MicroPython port this compares source against precompiled
+# bytecode:
+#
+#   micropython tests/bench_import.py              .py files from the repo
+#   python setup.py build_mpy
+#   micropython tests/bench_import.py build/mpy    the .mpy files
+#
+# from the repo root. The Unix port has no network module and no machine.Pin
+# and friends; the robot has them built in, so empty placeholders are
+# registered for them and cost nothing here either. Run with
+# "-X heapsize=..." if the default heap is too small to hold an import with
+# the collector off.
+#
+# Under CPython (python tests/bench_import.py) the figures are for the sim
+# backend and come from tracemalloc; .mpy files can't be loaded there.
+
+import gc
+import os
+import sys
+
+try:
+    import micropython
+except ImportError:
+    micropython = None
+
+ENTRIES = (
+    "enes193",
+    "enes193.tank",
+    "enes193.Enes193",
+    # Loaded by Enes193 on the first connect rather than at import
+    "enes193.uwebsockets",
+    "enes193.wifi_db",
+)
+
+
+def _repo_root():
+    here = __file__.rsplit("/", 1)[0] if "/" in __file__ else "."
+    return here + "/.."
+
+
+def _placeholders():
+    class _Hardware:
+        Pin = PWM = Timer = time_pulse_us = None
+
+    class _Network:
+        STA_IF = 0
+
+    sys.modules["machine"] = _Hardware
+    sys.modules["network"] = _Network
+
+
+def _measure_mpy(name):
+    import time
+    gc.collect()
+    base = gc.mem_alloc()
+    gc.disable()
+    t0 = time.ticks_us()
+    __import__(name)
+    us = time.ticks_diff(time.ticks_us(), t0)
+    alloc = gc.mem_alloc() - base
+    gc.enable()
+    gc.collect()
+    return us, alloc, gc.mem_alloc() - base
+
+
+def _measure_cpython(name):
+    import time
+    import tracemalloc
+    gc.collect()
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    __import__(name)
+    us = int((time.perf_counter() - t0) * 1000000)
+    alloc = tracemalloc.get_traced_memory()[1]
+    gc.collect()
+    kept = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return us, alloc, kept
+
+
+def _row(*cols):
+    print("{:<20} {:>10} {:>10} {:>10}".format(*cols))
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else _repo_root()
+    if len(sys.argv) > 2:
+        # One entry point, in this (fresh) interpreter
+        name = sys.argv[2]
+        sys.path.insert(0, path)
+        if micropython is not None:
+            _placeholders()
+            _row(name, *_measure_mpy(name))
+        else:
+            _row(name, *_measure_cpython(name))
+        return
+
+    print("modules from", path)
+    _row("entry point", "us", "alloc B", "kept B")
+    for name in ENTRIES:
+        os.system("{} {} {} {}".format(sys.executable, __file__, path, name))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+# Decode time and wire size of one pose in each encoding the vision system
+# can send:
+#
+#   json     an "aruco" text message, decoded the way _handle_message does:
+#            json.loads, then float() of x, y, theta and bool() of is_visible
+#   binary   the 16-byte OP_BYTES pose, one struct.unpack_from
+#
+# "handle" times Enes193._handle_message on the same payload, so the
+# bookkeeping around the decode (pose history, event, counters) is included.
+# Wire size is the payload plus the 2-byte header of an unmasked server
+# frame.
+#
+# Runs under CPython with the sim backend: python tests/bench_pose.py from
+# the repo root.
+
+import os
+import struct
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from enes193 import uwebsockets
+from enes193.Enes193 import Enes193
+from enes193.hal import _thread, json, time
+from enes193.pose import PoseHistory
+
+POSES = 20000
+
+
+def _json_payload():
+    return json.dumps({"op": "aruco", "x": 1.2345678, "y": 0.8765432,
+                       "theta": -2.3456789, "is_visible": True}).encode()
+
+
+def _binary_payload():
+    return struct.pack(Enes193._POSE_BIN_FMT, Enes193._POSE_BIN_OP, 1, 7,
+                       1.2345678, 0.8765432, -2.3456789)
+
+
+def _decode_json(payload):
+    data = json.loads(payload)
+    str(data.get("op", "")).lower()
+    return (float(data.get("x", -1.0)), float(data.get("y", -1.0)),
+            float(data.get("theta", -1.0)), bool(data.get("is_visible", False)))
+
+
+def _decode_binary(payload):
+    _, flags, _, x, y, t = struct.unpack_from(Enes193._POSE_BIN_FMT, payload)
+    return x, y, t, bool(flags & 1)
+
+
+def _us_per_pose(decode, payload):
+    t0 = time.ticks_us()
+    for _ in range(POSES):
+        decode(payload)
+    return time.ticks_diff(time.ticks_us(), t0) / POSES
+
+
+def main():
+    Enes193._lock = _thread.allocate_lock()
+    Enes193._pose_hist = PoseHistory(32)
+    variants = (
+        ("json", uwebsockets.OP_TEXT, _json_payload(), _decode_json),
+        ("binary", uwebsockets.OP_BYTES, _binary_payload(), _decode_binary),
+    )
+    print("{:>8} {:>10} {:>12} {:>12}".format("encoding", "wire B", "decode us", "handle us"))
+    for name, opcode, payload, decode in variants:
+        view = memoryview(payload)
+        handle = lambda p: Enes193._handle_message(opcode, p)
+        print("{:>8} {:>10} {:>12.2f} {:>12.2f}".format(
+            name, len(payload) + 2, _us_per_pose(decode, view), _us_per_pose(handle, view)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+# Time to reconnect to the vision system with and without the cached
+# (URI, address) entry in Enes193._ws_targets:
+#
+#   cold     cache emptied before each connect: URL parse and getaddrinfo
+#            every time, as before the cache
+#   cached   the entry from the previous connect is reused
+#
+# Each connect is the whole of _connect_ws_and_begin(): drop the old socket,
+# TCP connect, handshake and the begin message, against the stand-in server
+# in vision_server.py on localhost. The host is a name rather than an
+# address so the lookup isn't short-circuited; on the robot it goes through
+# the network's resolver and the difference is larger.
+#
+# Runs under CPython with the sim backend: python tests/bench_reconnect.py
+# from the repo root.
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from enes193.Enes193 import Enes193
+from enes193.hal import _thread, time
+from vision_server import VisionServer
+
+CONNECTS = 200
+
+
+def _us_per_connect(cold):
+    t0 = time.ticks_us()
+    for _ in range(CONNECTS):
+        if cold:
+            Enes193._ws_targets.clear()
+        Enes193._connect_ws_and_begin()
+    return time.ticks_diff(time.ticks_us(), t0) // CONNECTS
+
+
+def main():
+    server = VisionServer()
+    Enes193._lock = _thread.allocate_lock()
+    Enes193.ROOM_IP_MAP = {9999: "localhost"}
+    Enes193.WS_PORT = server.port
+    Enes193._configure("Bench", "WATER", 3, 9999)
+    Enes193._connect_ws_and_begin()
+    print("{:>8} {:>12}".format("target", "us/connect"))
+    for name, cold in (("cold", True), ("cached", False)):
+        print("{:>8} {:>12}".format(name, _us_per_connect(cold)))
+    Enes193._drop_ws()
+    server.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+# Heap the worker allocates in steady state, per minute, with the message
+# templates from _build_templates() against building a dict and running
+# json.dumps for every message as the worker used to:
+#
+#   dicts      aruco requests and print batches sent through _ws_send(dict)
+#   templates  the current code: prebuilt aruco payload, print text spliced
+#              between _msg_print_head and "}"
+#
+# A simulated minute of polling with a print() every PRINT_EVERY_MS is run
+# through the real _service(), which calls _flush_print_queue(), into a fake
+# socket that only counts bytes. Keepalive is off since the ping is a control
+# frame either way, and nothing is log()ged.
+#
+# Runs under CPython with the sim backend: python tests/bench_service.py from
+# the repo root. Each _service() call is measured as the tracemalloc peak
+# above the starting level, and those peaks are summed over the minute, so
+# "heap B/min" is roughly what a MicroPython worker leaves for the collector
+# in a minute.
+
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from enes193 import uwebsockets
+from enes193.Enes193 import Enes193
+from enes193.hal import _thread
+from fake_socket import FakeSocket
+
+MINUTE_MS = 60000
+PRINT_EVERY_MS = 100
+
+
+def _dicts_send_raw(data, *more):
+    # Only the aruco request reaches here: no pings, pongs or telemetry
+    assert data is Enes193._msg_aruco
+    Enes193._ws_send({"op": "aruco", "teamName": Enes193._team_name})
+
+
+def _dicts_flush_print_queue():
+    with Enes193._lock:
+        if not Enes193._print_queue:
+            return
+        to_send = Enes193._print_queue.pop_all()
+    text = to_send[0] if len(to_send) == 1 else "\n".join(to_send)
+    Enes193._ws_send({"op": "print", "teamName": Enes193._team_name, "message": text})
+
+
+def _run_minute():
+    # Returns (heap bytes summed over the minute, worst single call, bytes sent)
+    sock = FakeSocket(keep=False)
+    ws = uwebsockets.WebsocketClient(sock)
+    ws.keepalive(0)
+    Enes193._ws = ws
+    Enes193._connected = True
+    Enes193._last_pose_req_ms = Enes193._last_telemetry_ms = 0
+
+    total = worst = 0
+    next_print = 0
+    now = 0
+    tracemalloc.start()
+    while now < MINUTE_MS:
+        if now >= next_print:
+            Enes193.print("distance {} cm".format(now % 97))
+            next_print += PRINT_EVERY_MS
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        wait = Enes193._service(now)
+        used = tracemalloc.get_traced_memory()[1] - base
+        total += used
+        worst = max(worst, used)
+        now += max(1, min(wait, next_print - now))
+    tracemalloc.stop()
+    return total, worst, sock.written
+
+
+def main():
+    Enes193._lock = _thread.allocate_lock()
+    Enes193._configure("Bench", "WATER", 3, 9999)
+    current = {name: vars(Enes193)[name] for name in ("_ws_send_raw", "_flush_print_queue")}
+    dicts = {"_ws_send_raw": staticmethod(_dicts_send_raw),
+             "_flush_print_queue": staticmethod(_dicts_flush_print_queue)}
+
+    print("{:>10} {:>12} {:>12} {:>12}".format("variant", "wire B/min", "heap B/min", "worst B"))
+    for name, methods in (("dicts", dicts), ("templates", current)):
+        for attr, method in methods.items():
+            setattr(Enes193, attr, method)
+        total, worst, sent = _run_minute()
+        print("{:>10} {:>12} {:>12} {:>12}".format(name, sent, total, worst))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+import pytest
+
+from enes193.Enes193 import Enes193
+from vision_server import VisionServer, wait_until
+
+
+@pytest.fixture
+def enes193():
+    # Enes193 keeps all of its state on the class; put it back afterwards
+    saved = dict(vars(Enes193))
+    yield Enes193
+    for name in list(vars(Enes193)):
+        if name not in saved:
+            delattr(Enes193, name)
+    for name, value in saved.items():
+        if name not in ("__dict__", "__weakref__", "__doc__") and vars(Enes193).get(name) is not value:
+            setattr(Enes193, name, value)
+
+
+@pytest.fixture
+def vision(enes193):
+    # Starts a VisionServer and begin()s Enes193 against it, worker thread
+    # and all; stops both afterwards
+    servers = []
+
+    def start(subscribe="ok"):
+        server = VisionServer(subscribe)
+        servers.append(server)
+        enes193.REQUIRE_KNOWN_MAC = False
+        enes193.ROOM_IP_MAP = {9999: "127.0.0.1"}
+        enes193.WS_PORT = server.port
+        # A fresh dict: the class one may hold an earlier test's address
+        enes193._ws_targets = {}
+        assert enes193.begin("Sim", "WATER", 3, 9999)
+        return server
+
+    yield start
+    enes193.stop()
+    assert wait_until(lambda: not enes193._thread_started)
+    for server in servers:
+        server.close()
@@ -0,0 +1,61 @@
+# A socket for driving a websocket without a peer: every write is taken in
+# full and, unless keep=False, kept so the frames can be read back. Also
+# builds the unmasked frames a server sends, for feeding a websocket.
+
+import socket
+import struct
+
+
+def server_frame(opcode, payload, fin=True):
+    n = len(payload)
+    byte1 = (0x80 if fin else 0) | opcode
+    if n < 126:
+        head = struct.pack('!BB', byte1, n)
+    elif n < 1 << 16:
+        head = struct.pack('!BBH', byte1, 126, n)
+    else:
+        head = struct.pack('!BBQ', byte1, 127, n)
+    return head + payload
+
+
+class FakeSocket:
+    def __init__(self, keep=True):
+        self.written = 0
+        self.data = bytearray() if keep else None
+        # Never read or written; the websocket registers it with its poller
+        self._end, self._peer = socket.socketpair()
+
+    def fileno(self):
+        return self._end.fileno()
+
+    def setblocking(self, flag):
+        pass
+
+    def write(self, buf):
+        n = len(buf)
+        self.written += n
+        if self.data is not None:
+            self.data += buf
+        return n
+
+    def close(self):
+        self._end.close()
+        self._peer.close()
+
+    def messages(self):
+        """Unmasked payloads of the client frames written so far."""
+        data = self.data
+        i = 0
+        while i < len(data):
+            n = data[i + 1] & 0x7f
+            i += 2
+            if n == 126:
+                n = int.from_bytes(data[i:i + 2], "big")
+                i += 2
+            elif n == 127:
+                n = int.from_bytes(data[i:i + 8], "big")
+                i += 8
+            key = data[i:i + 4]
+            i += 4
+            yield bytes(b ^ key[k & 3] for k, b in enumerate(data[i:i + n]))
+            i += n
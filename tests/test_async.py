@@ -0,0 +1,67 @@
+# The asyncio API (begin_async, next_pose, mission_async) against the
+# stand-in vision server, with uasyncio coming from sim.py's shim.
+
+import pytest
+
+from enes193 import mission as m
+from enes193.hal import load_asyncio
+from vision_server import VisionServer
+
+asyncio = load_asyncio()
+
+
+@pytest.fixture
+def server(enes193):
+    server = VisionServer()
+    enes193.REQUIRE_KNOWN_MAC = False
+    enes193.ROOM_IP_MAP = {9999: "127.0.0.1"}
+    enes193.WS_PORT = server.port
+    enes193._ws_targets = {}
+    enes193._mission_pending = []
+    enes193._mission_status = {}
+    yield server
+    server.close()
+
+
+async def _stop(enes193):
+    enes193.stop()
+    while enes193._async_task is not None:
+        await asyncio.sleep_ms(10)
+
+
+def test_begin_async_and_next_pose(enes193, server):
+    async def main():
+        assert await enes193.begin_async("Sim", "WATER", 3, 9999)
+        assert enes193.isConnected()
+        assert not enes193._thread_started
+
+        # Polled at 4 Hz: each pose is a newer camera frame
+        poses = [await enes193.next_pose() for _ in range(3)]
+        assert [p[5] for p in poses] == sorted({p[5] for p in poses})
+        assert all(p[3] for p in poses)
+        assert poses[0][0] < poses[1][0] < poses[2][0]
+
+        enes193.subscribePose(20)
+        while not enes193.isPoseStreaming():
+            await asyncio.sleep_ms(10)
+        seq = (await enes193.next_pose())[5]
+        for _ in range(5):
+            assert (await enes193.next_pose())[5] > seq
+
+        assert await enes193.mission_async(m.DEPTH, 42) is True
+        await _stop(enes193)
+
+    asyncio.run(main())
+    assert server.count("begin") == 1
+    assert server.count("mission") == 1
+    assert server.count("aruco") >= 3
+
+
+def test_begin_async_refuses_after_begin(enes193, server):
+    enes193._thread_started = True
+
+    async def main():
+        with pytest.raises(RuntimeError):
+            await enes193.begin_async("Sim", "WATER", 3, 9999)
+
+    asyncio.run(main())
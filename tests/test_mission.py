@@ -0,0 +1,150 @@
+# MissionFormatter output, table-driven. The expected sentences are written
+# out literally (they are what the vision system shows), not derived from
+# mission.MESSAGES, so a mistake in the table shows up here.
+
+import pytest
+
+from enes193 import mission as m
+
+PREFIX = "MISSION MESSAGE: "
+
+# (mission, type, value, expected sentence)
+CASES = [
+    # CRASH
+    ("CRASH", m.DIRECTION, m.PLUS_X, "The direction of the abnormality is in the +x direction."),
+    ("CRASH", m.DIRECTION, m.MINUS_X, "The direction of the abnormality is in the -x direction."),
+    ("CRASH", m.DIRECTION, m.PLUS_Y, "The direction of the abnormality is in the +y direction."),
+    ("CRASH", m.DIRECTION, m.MINUS_Y, "The direction of the abnormality is in the -y direction."),
+    ("CRASH", m.DIRECTION, 9, "The direction of the abnormality is in the ????? direction."),
+    ("CRASH", m.LENGTH, 0, "The length of the side with abnormality is 0mm."),
+    ("CRASH", m.LENGTH, 42, "The length of the side with abnormality is 42mm."),
+    ("CRASH", m.LENGTH, -3, "The length of the side with abnormality is -3mm."),
+    ("CRASH", m.HEIGHT, 0, "The height of the side with abnormality is 0mm."),
+    ("CRASH", m.HEIGHT, 42, "The height of the side with abnormality is 42mm."),
+    ("CRASH", m.HEIGHT, -3, "The height of the side with abnormality is -3mm."),
+    ("CRASH", 7, 0, "The direction of the abnormality is in the ????? direction."),  # no such type
+
+    # DATA
+    ("DATA", m.CYCLE, 0, "The duty cycle is 0%."),
+    ("DATA", m.CYCLE, 42, "The duty cycle is 42%."),
+    ("DATA", m.CYCLE, -3, "The duty cycle is -3%."),
+    ("DATA", m.MAGNETISM, m.MAGNETIC, "The disk is MAGNETIC."),
+    ("DATA", m.MAGNETISM, m.NOT_MAGNETIC, "The disk is NOT MAGNETIC."),
+    ("DATA", m.MAGNETISM, 9, "The disk is ?????."),
+    ("DATA", 7, 0, "The disk is ?????."),  # no such type
+
+    # MATERIAL
+    ("MATERIAL", m.WEIGHT, m.HEAVY, "The weight of the material is HEAVY."),
+    ("MATERIAL", m.WEIGHT, m.MEDIUM, "The weight of the material is MEDIUM."),
+    ("MATERIAL", m.WEIGHT, m.LIGHT, "The weight of the material is LIGHT."),
+    ("MATERIAL", m.WEIGHT, 9, "The weight of the material is ?????."),
+    ("MATERIAL", m.MATERIAL_TYPE, m.FOAM, "The material is SQUISHY."),
+    ("MATERIAL", m.MATERIAL_TYPE, m.PLASTIC, "The material is NOT SQUISHY."),
+    ("MATERIAL", m.MATERIAL_TYPE, 9, "The material is ?????."),
+    ("MATERIAL", 7, 0, "The material is ?????."),  # no such type
+
+    # FIRE
+    ("FIRE", m.NUM_CANDLES, 0, "The number of candles lit is 0."),
+    ("FIRE", m.NUM_CANDLES, 42, "The number of candles lit is 42."),
+    ("FIRE", m.NUM_CANDLES, -3, "The number of candles lit is -3."),
+    ("FIRE", m.TOPOGRAPHY, m.TOP_A, "The topography of the fire mission is:  A"),
+    ("FIRE", m.TOPOGRAPHY, m.TOP_B, "The topography of the fire mission is:  B"),
+    ("FIRE", m.TOPOGRAPHY, m.TOP_C, "The topography of the fire mission is:  C"),
+    ("FIRE", m.TOPOGRAPHY, 9, "The topography of the fire mission is:  ?????"),
+    ("FIRE", 7, 0, "The topography of the fire mission is:  ?????"),  # no such type
+
+    # WATER
+    ("WATER", m.DEPTH, 0, "The depth of the water is 0mm."),
+    ("WATER", m.DEPTH, 42, "The depth of the water is 42mm."),
+    ("WATER", m.DEPTH, -3, "The depth of the water is -3mm."),
+    ("WATER", m.WATER_TYPE, m.FRESH_UNPOLLUTED, "The water is FRESH and UNPOLLUTED."),
+    ("WATER", m.WATER_TYPE, m.FRESH_POLLUTED, "The water is FRESH and POLLUTED."),
+    ("WATER", m.WATER_TYPE, m.SALTY_UNPOLLUTED, "The water is SALTY and UNPOLLUTED."),
+    ("WATER", m.WATER_TYPE, m.SALTY_POLLUTED, "The water is SALTY and POLLUTED."),
+    ("WATER", m.WATER_TYPE, 9, "The water is ?????."),
+    ("WATER", 7, 0, "The water is ?????."),  # no such type
+
+    # SEED
+    ("SEED", m.LOCATION, m.BOTH, "The far plots are BOTH plantable substrate."),
+    ("SEED", m.LOCATION, m.NEITHER, "The far plots are NEITHER plantable substrate."),
+    ("SEED", m.LOCATION, m.ADJACENT, "The far plots are ADJACENT plantable substrate."),
+    ("SEED", m.LOCATION, m.DIAGONAL, "The far plots are DIAGONAL plantable substrate."),
+    ("SEED", m.LOCATION, 9, "The far plots are ????? plantable substrate."),
+    ("SEED", 7, 0, "The far plots are ????? plantable substrate."),  # no such type
+
+    # HYDROGEN
+    ("HYDROGEN", m.LED_COLOR, m.WHITE, "The LED color is WHITE."),
+    ("HYDROGEN", m.LED_COLOR, m.RED, "The LED color is RED."),
+    ("HYDROGEN", m.LED_COLOR, m.YELLOW, "The LED color is YELLOW."),
+    ("HYDROGEN", m.LED_COLOR, m.GREEN, "The LED color is GREEN."),
+    ("HYDROGEN", m.LED_COLOR, m.BLUE, "The LED color is BLUE."),
+    ("HYDROGEN", m.LED_COLOR, 9, "The LED color is ?????."),
+    ("HYDROGEN", m.VOLTAGE_OUTPUT, m.VOLTAGE_1, "The voltage output is 1 VOLT."),
+    ("HYDROGEN", m.VOLTAGE_OUTPUT, m.VOLTAGE_2, "The voltage output is 2 VOLTS."),
+    ("HYDROGEN", m.VOLTAGE_OUTPUT, m.VOLTAGE_3, "The voltage output is 3 VOLTS."),
+    ("HYDROGEN", m.VOLTAGE_OUTPUT, m.VOLTAGE_4, "The voltage output is 4 VOLTS."),
+    ("HYDROGEN", m.VOLTAGE_OUTPUT, m.VOLTAGE_5, "The voltage output is 5 VOLTS."),
+    ("HYDROGEN", m.VOLTAGE_OUTPUT, 9, "The voltage output is ?????."),
+    ("HYDROGEN", 7, 0, "The LED color is ?????."),  # no such type
+]
+
+
+def _show(mission, mtype, value):
+    f = m.MissionFormatter()
+    f.set_mission(mission)
+    out = []
+    assert f.handle(mtype, value, lambda s: out.append(s) or True) is True
+    return out[0]
+
+
+@pytest.mark.parametrize("mission, mtype, value, expected", CASES)
+def test_message(mission, mtype, value, expected):
+    assert _show(mission, mtype, value) == PREFIX + expected
+
+
+@pytest.mark.parametrize("spelling", ["water", "Water", "  WATER\n"])
+def test_mission_name_is_normalized(spelling):
+    for mission, mtype, value, expected in CASES:
+        if mission == "WATER":
+            assert _show(spelling, mtype, value) == PREFIX + expected
+
+
+@pytest.mark.parametrize("alias", ["CRASH_SITE", "crashsite"])
+def test_crash_aliases(alias):
+    for mission, mtype, value, expected in CASES:
+        if mission == "CRASH":
+            assert _show(alias, mtype, value) == PREFIX + expected
+
+
+def test_values_are_converted_to_int():
+    assert _show("WATER", m.DEPTH, 41.9) == PREFIX + "The depth of the water is 41mm."
+    assert _show("WATER", m.DEPTH, "17") == PREFIX + "The depth of the water is 17mm."
+    assert _show("DATA", m.MAGNETISM, 1.0) == PREFIX + "The disk is NOT MAGNETIC."
+
+
+@pytest.mark.parametrize("mtype", [0, 1, 7])
+def test_unknown_mission(mtype):
+    assert _show("lunar", mtype, 0) == PREFIX + "Unknown mission 'LUNAR'."
+
+
+@pytest.mark.parametrize("mission", [None, "", "   "])
+def test_mission_not_set(mission):
+    assert _show(mission, 1, 2) == PREFIX + "Mission is not set. Got type=1 message=2."
+
+
+def test_set_mission_again_replaces_messages():
+    f = m.MissionFormatter()
+    f.set_mission("WATER")
+    f.set_mission("seed")
+    assert f.get_mission() == "SEED"
+    out = []
+    f.handle(m.LOCATION, m.BOTH, out.append)
+    assert out == [PREFIX + "The far plots are BOTH plantable substrate."]
+
+
+def test_cases_cover_the_table():
+    covered = {(mission, mtype, value) for mission, mtype, value, _ in CASES}
+    for (mission, mtype), (sentence, labels) in m.MESSAGES.items():
+        for value in labels or (42,):
+            assert (mission, mtype, value) in covered
+    assert {mission for mission, _, _, _ in CASES} == set(m.FALLBACKS)
@@ -0,0 +1,93 @@
+# mission() submissions end to end: acks, retries, resends after a reconnect
+# and the print fallback, against the stand-in vision server.
+
+import json
+import time as _time
+
+import pytest
+
+from enes193 import mission as m, uwebsockets
+from enes193.hal import _thread
+from fake_socket import FakeSocket
+from vision_server import wait_until
+
+
+@pytest.fixture
+def missions(enes193, vision):
+    enes193._mission_pending = []
+    enes193._mission_status = {}
+    enes193.MISSION_RETRY_MS = 100
+    return vision
+
+
+def test_acked_mission_is_delivered(enes193, missions):
+    server = missions()
+    seq = enes193.mission(m.DEPTH, 42)
+    assert not enes193.missionDelivered(seq)
+    assert wait_until(lambda: enes193.missionDelivered(seq))
+    _time.sleep(0.3)
+    assert server.count("mission") == 1
+    assert not enes193._mission_pending
+
+
+def test_unacked_mission_is_resent(enes193, missions):
+    server = missions()
+    server.drop_missions = 2
+    seq = enes193.mission(m.DEPTH, 42)
+    assert wait_until(lambda: enes193.missionDelivered(seq))
+    assert server.count("mission") == 3
+    sent = [t for op, t in server.ops if op == "mission"]
+    for a, b in zip(sent, sent[1:]):
+        assert 0.08 <= b - a <= 0.3
+
+
+def test_mission_is_resent_after_reconnect(enes193, missions):
+    enes193.MISSION_RETRY_MS = 10000
+    server = missions()
+    server.drop_missions = 1
+    seq = enes193.mission(m.DEPTH, 42)
+    assert wait_until(lambda: server.count("mission") == 1)
+    server.drop_clients()
+    # Sent again on the new connection rather than a retry period later
+    assert wait_until(lambda: enes193.missionDelivered(seq), timeout=2.0)
+    assert server.count("begin") == 2
+    assert server.count("mission") == 2
+
+
+def test_unacked_mission_falls_back_to_print(enes193, missions):
+    enes193.MISSION_MAX_TRIES = 3
+    server = missions()
+    server.drop_missions = 1000
+    seq = enes193.mission(m.DEPTH, 42)
+    text = enes193._mission_pending[0][3]
+    assert wait_until(lambda: seq in enes193._mission_status)
+    assert enes193._mission_status[seq] is False
+    assert not enes193.missionDelivered(seq)
+    assert server.count("mission") == 3
+    assert wait_until(lambda: text in server.prints)
+
+
+def test_fallback_survives_a_print_burst(enes193):
+    # Driven by hand so the burst lands between the fallback and the next
+    # flush of the print queue
+    enes193._lock = _thread.allocate_lock()
+    enes193._mission_pending = []
+    enes193._mission_status = {}
+    enes193.PRINT_OVERFLOW = enes193.DROP_OLDEST
+    enes193._configure("Sim", "WATER", 3, 9999)
+    sock = FakeSocket()
+    enes193._ws = uwebsockets.WebsocketClient(sock)
+    enes193._connected = True
+
+    seq = enes193.mission(m.DEPTH, 42)
+    text = enes193._mission_pending[0][3]
+    enes193._mission_pending[0][4] = enes193.MISSION_MAX_TRIES
+    enes193._send_missions(0)
+    for i in range(2 * enes193.PRINT_QUEUE_SLOTS):
+        enes193.print("burst %d" % i)
+    enes193._flush_print_queue()
+
+    assert enes193._mission_status[seq] is False
+    prints = [json.loads(p)["message"] for p in sock.messages()]
+    assert prints[0] == text
+    assert prints[1].startswith("burst ")
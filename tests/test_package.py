@@ -0,0 +1,78 @@
+# What "import enes193" binds, checked in a fresh interpreter each time since
+# the answer depends on which spelling imported the submodules first.
+
+import os
+import subprocess
+import sys
+import textwrap
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _run(first, code):
+    code = first + "\n" + textwrap.dedent(code)
+    r = subprocess.run([sys.executable, "-c", code],
+                       cwd=ROOT, capture_output=True, text=True, timeout=60)
+    assert r.returncode == 0, r.stderr
+
+
+@pytest.mark.parametrize("first", [
+    "from enes193 import Enes193",
+    "from enes193.Enes193 import Enes193",
+    "import enes193.Enes193",
+])
+def test_enes193_settings_reach_the_class(first):
+    _run(first, """
+        import enes193
+        from enes193.Enes193 import Enes193 as cls
+        assert enes193.Enes193 is cls
+        enes193.Enes193.REQUIRE_KNOWN_MAC = False
+        enes193.Enes193.DEBUG = True
+        enes193.Enes193.PRINT_OVERFLOW = cls.BLOCK
+        enes193.Enes193.KEEPALIVE_INTERVAL_MS = 500
+        assert cls.REQUIRE_KNOWN_MAC is False
+        assert cls.DEBUG is True
+        assert cls.PRINT_OVERFLOW == cls.BLOCK
+        assert cls.KEEPALIVE_INTERVAL_MS == 500
+    """)
+
+
+@pytest.mark.parametrize("first", [
+    "from enes193 import tank",
+    "from enes193.tank import tank",
+    "import enes193.tank",
+])
+def test_tank_is_the_instance(first):
+    _run(first, """
+        import enes193
+        from enes193.tank import tank as obj
+        assert enes193.tank is obj
+        enes193.tank.SAMPLE_PERIOD_MS = 80
+        assert obj.SAMPLE_PERIOD_MS == 80
+    """)
+
+
+def test_import_leaves_pins_and_network_alone():
+    _run("import sys", """
+        import enes193
+        from enes193 import sim
+        assert not sim._pins
+        assert "enes193.uwebsockets" not in sys.modules
+        assert "enes193.wifi_db" not in sys.modules
+
+        # Looking around, or a typo, doesn't set the pins up either
+        assert not hasattr(enes193.tank, "pwma")
+        try:
+            enes193.tank.set_left_pwm(300)
+        except AttributeError:
+            pass
+        else:
+            raise AssertionError("typo went through")
+        assert not sim._pins
+
+        enes193.tank.set_left_PWM(300)
+        assert enes193.tank.pwmb.duty() == 300
+        assert enes193.tank.servo1.duty_u16() > 0
+    """)
@@ -0,0 +1,179 @@
+# PoseHistory lookups by time, and the PosePredictor dead reckoning, driven
+# by a hand-set clock.
+
+import math
+
+import pytest
+
+from enes193 import hal
+from enes193.hal import time
+from enes193.pose import PoseHistory, PosePredictor
+
+PERIOD = 1 << 30   # where the sim's ticks wrap, as on the ESP32
+
+
+def _history(*samples):
+    h = PoseHistory(8)
+    for s in samples:
+        h.add(*s)
+    return h
+
+
+def _approx(pose, expected):
+    # The history stores float32, so compare loosely
+    assert pose[3:] == expected[3:]
+    assert pose[:3] == pytest.approx(expected[:3], abs=1e-5)
+
+
+def test_empty_history():
+    assert PoseHistory(4).at(0) is None
+
+
+def test_interpolates_between_samples():
+    h = _history((0.0, 0.0, 0.0, True, 1000), (1.0, 2.0, 0.5, True, 1100))
+    _approx(h.at(1050), (0.5, 1.0, 0.25, True, 1050))
+    _approx(h.at(1025), (0.25, 0.5, 0.125, True, 1025))
+    # Exactly on a sample: that sample, with its own time
+    _approx(h.at(1000), (0.0, 0.0, 0.0, True, 1000))
+    _approx(h.at(1100), (1.0, 2.0, 0.5, True, 1100))
+
+
+@pytest.mark.parametrize("t, theta", [
+    (1050, math.pi),
+    (1025, 3.0 + 0.25 * (2 * math.pi - 6.0)),
+    (1075, 3.0 + 0.75 * (2 * math.pi - 6.0) - 2 * math.pi),
+])
+def test_theta_takes_the_short_way_round(t, theta):
+    # 3.0 to -3.0 is 0.28 rad through +-pi, not 6 rad through zero
+    h = _history((0.0, 0.0, 3.0, True, 1000), (0.0, 0.0, -3.0, True, 1100))
+    got = h.at(t)[2]
+    assert -math.pi <= got <= math.pi
+    assert math.cos(got - theta) == pytest.approx(1.0)
+    assert abs(got) > 3.0
+
+
+def test_clamps_outside_the_history():
+    h = _history((0.0, 0.0, 0.0, True, 1000), (1.0, 1.0, 1.0, True, 1100))
+    _approx(h.at(500), (0.0, 0.0, 0.0, True, 1000))
+    _approx(h.at(5000), (1.0, 1.0, 1.0, True, 1100))
+
+
+@pytest.mark.parametrize("t, nearer", [(1040, 0), (1050, 0), (1060, 1)])
+@pytest.mark.parametrize("visible", [(True, False), (False, True)])
+def test_never_interpolates_across_visibility(t, nearer, visible):
+    samples = [(0.0, 0.0, 0.0, visible[0], 1000), (1.0, 1.0, 1.0, visible[1], 1100)]
+    h = _history(*samples)
+    # The nearer sample as it is; a tie goes to the older one
+    _approx(h.at(t), samples[nearer])
+
+
+def test_interpolates_across_ticks_wraparound():
+    t0 = PERIOD - 50
+    t1 = time.ticks_add(t0, 100)
+    assert t1 == 50
+    h = _history((0.0, 0.0, 0.0, True, t0), (2.0, 0.0, 0.0, True, t1))
+    _approx(h.at(0), (1.0, 0.0, 0.0, True, 0))
+    _approx(h.at(time.ticks_add(t0, -10)), (0.0, 0.0, 0.0, True, t0))
+    _approx(h.at(60), (2.0, 0.0, 0.0, True, t1))
+
+
+def test_only_the_newest_samples_are_kept():
+    h = PoseHistory(4)
+    for k in range(10):
+        h.add(float(k), 0.0, 0.0, True, 1000 + 100 * k)
+    assert len(h) == 4
+    assert [p[0] for p in h.latest(10)] == [9.0, 8.0, 7.0, 6.0]
+    # Older than what's left: clamps to the oldest kept
+    _approx(h.at(1000), (6.0, 0.0, 0.0, True, 1600))
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    # time.ticks_ms() returns clock.now, moved on by hand
+    class Clock:
+        now = 10000
+
+        def advance(self, ms):
+            self.now = time.ticks_add(self.now, ms)
+
+    c = Clock()
+    monkeypatch.setattr(hal.time, "ticks_ms", lambda: c.now)
+    return c
+
+
+def _fix(p, clock, x, y, theta, seq=1, age=0, visible=True):
+    p.correct((x, y, theta, visible, time.ticks_add(clock.now, -age), seq))
+
+
+def test_invalid_until_the_first_visible_fix(clock):
+    p = PosePredictor()
+    assert p.predict() == (-1.0, -1.0, -1.0, False)
+    _fix(p, clock, 1.0, 1.0, 0.0, visible=False)
+    assert p.predict()[3] is False
+    _fix(p, clock, 1.0, 2.0, 0.5, seq=2)
+    assert p.predict() == (1.0, 2.0, 0.5, True)
+
+
+def test_deadband(clock):
+    p = PosePredictor()
+    _fix(p, clock, 1.0, 1.0, 0.0)
+    p.command(left=p.PWM_DEADBAND - 1, right=-(p.PWM_DEADBAND - 1))
+    clock.advance(1000)
+    assert p.predict() == (1.0, 1.0, 0.0, True)
+
+
+def test_straight_line(clock):
+    p = PosePredictor()
+    _fix(p, clock, 0.0, 0.0, math.pi / 2)
+    p.command(left=500, right=500)
+    clock.advance(1000)
+    x, y, theta, valid = p.predict()
+    assert valid
+    assert (x, y, theta) == pytest.approx((0.0, 500 * p.SPEED_PER_PWM, math.pi / 2))
+    # Stopping holds the pose
+    p.command(0, 0)
+    clock.advance(500)
+    assert p.predict()[:3] == pytest.approx((x, y, theta))
+
+
+def test_spin_in_place(clock):
+    p = PosePredictor()
+    _fix(p, clock, 1.0, 1.0, 0.0)
+    p.command(left=-500, right=500)
+    clock.advance(500)
+    w = 2 * 500 * p.SPEED_PER_PWM / p.TRACK_WIDTH
+    assert p.predict()[:3] == pytest.approx((1.0, 1.0, w * 0.5))
+
+
+def test_vision_fix_is_blended_in(clock):
+    p = PosePredictor()
+    _fix(p, clock, 0.0, 0.0, 3.0)
+    clock.advance(100)
+    _fix(p, clock, 1.0, -1.0, -3.0, seq=2)
+    g = p.GAIN
+    theta = 3.0 + g * (2 * math.pi - 6.0) - 2 * math.pi   # across +-pi
+    assert p.predict()[:3] == pytest.approx((g, -g, theta))
+    # The same sample again changes nothing
+    _fix(p, clock, 1.0, -1.0, -3.0, seq=2)
+    assert p.predict()[:3] == pytest.approx((g, -g, theta))
+
+
+def test_old_fix_is_carried_forward(clock):
+    # A sample taken 200 ms ago while driving is moved on by 200 ms of
+    # travel before it is blended in
+    p = PosePredictor()
+    p.command(left=500, right=500)
+    _fix(p, clock, 0.0, 0.0, 0.0, age=200)
+    assert p.predict()[:3] == pytest.approx((0.2 * 500 * p.SPEED_PER_PWM, 0.0, 0.0))
+
+
+def test_gives_up_after_max_coast(clock):
+    p = PosePredictor()
+    _fix(p, clock, 0.0, 0.0, 0.0)
+    clock.advance(p.MAX_COAST_MS)
+    assert p.predict()[3] is True
+    clock.advance(1)
+    assert p.predict() == (-1.0, -1.0, -1.0, False)
+    # The next fix after coasting too long is taken as it is, not blended
+    _fix(p, clock, 2.0, 3.0, 1.0, seq=2)
+    assert p.predict() == pytest.approx((2.0, 3.0, 1.0, True))
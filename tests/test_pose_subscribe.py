@@ -0,0 +1,88 @@
+# Pose polling and subscription end to end: Enes193's worker thread against
+# the stand-in vision server in vision_server.py.
+
+import time as _time
+
+import pytest
+
+from vision_server import measure_latency, wait_until
+
+
+def _fresh(enes193):
+    return 0 <= enes193.poseAge() < 400
+
+
+def test_polling_by_default(enes193, vision):
+    server = vision()
+    assert wait_until(lambda: enes193.getPose()[5] > 0)
+    t = _time.monotonic()
+    _time.sleep(1.0)
+    assert 3 <= server.count("aruco", t) <= 6   # 4 Hz
+    assert server.count("subscribe") == 0
+    assert not enes193.isPoseStreaming()
+    assert _fresh(enes193)
+
+
+def test_push_replaces_polling(enes193, vision):
+    server = vision()
+    enes193.subscribePose(20)
+    assert wait_until(enes193.isPoseStreaming)
+    t = _time.monotonic()
+    seq = enes193.getPose()[5]
+    _time.sleep(1.0)
+    assert server.count("aruco", t) == 0
+    assert enes193.getPose()[5] - seq >= 15   # about 20 in a second
+    assert _fresh(enes193)
+
+
+@pytest.mark.parametrize("answer", [None, "unsupported"])
+def test_polling_when_subscribe_not_acked(enes193, vision, answer):
+    server = vision(subscribe=answer)
+    enes193.subscribePose(20)
+    assert wait_until(lambda: server.count("subscribe") == 1)
+    t = _time.monotonic()
+    # No answer: polling goes on while it waits out the 1 s ack timeout
+    _time.sleep(1.5)
+    assert not enes193.isPoseStreaming()
+    assert server.count("aruco", t) >= 5
+    assert server.count("subscribe") == 1
+    assert _fresh(enes193)
+
+
+def test_polling_resumes_when_stream_stalls(enes193, vision):
+    server = vision()
+    enes193.subscribePose(20)
+    assert wait_until(enes193.isPoseStreaming)
+    server.pushing = False
+    t = _time.monotonic()
+    assert wait_until(lambda: not enes193.isPoseStreaming(), timeout=2.0)
+    # Declared stale about a second after the last pushed pose
+    assert 0.8 <= _time.monotonic() - t <= 1.5
+    assert wait_until(lambda: server.count("aruco", t) >= 2)
+    assert wait_until(lambda: _fresh(enes193))
+
+
+def test_resubscribes_after_reconnect(enes193, vision):
+    server = vision()
+    enes193.subscribePose(20)
+    assert wait_until(enes193.isPoseStreaming)
+    server.drop_clients()
+    assert wait_until(lambda: server.count("begin") == 2)
+    assert wait_until(lambda: server.count("subscribe") == 2)
+    assert wait_until(enes193.isPoseStreaming)
+    t = _time.monotonic()
+    _time.sleep(0.5)
+    assert server.count("aruco", t) == 0
+    assert _fresh(enes193)
+
+
+def test_push_is_fresher_than_polling(enes193, vision):
+    server = vision()
+    assert wait_until(lambda: enes193.getPose()[5] > 0)
+    polled = measure_latency(enes193, server, 1.5)[0]
+    enes193.subscribePose(20)
+    assert wait_until(enes193.isPoseStreaming)
+    pushed = measure_latency(enes193, server, 1.5)[0]
+    # Polling at 4 Hz averages about half a period behind; pushing at
+    # 20 Hz about half of 50 ms
+    assert pushed < 60 < polled
@@ -0,0 +1,81 @@
+# Pose updates as the vision system sends them, binary and JSON, fed
+# through a websocket into Enes193's message handling.
+
+import json
+import socket
+import struct
+
+import pytest
+
+from enes193 import uwebsockets
+from enes193.Enes193 import Enes193
+from enes193.hal import _thread
+from enes193.pose import PoseHistory
+from enes193.sim import Socket
+from fake_socket import server_frame
+
+
+@pytest.fixture
+def peer(enes193):
+    # Connected Enes193 whose server end is returned
+    a, b = socket.socketpair()
+    enes193._lock = _thread.allocate_lock()
+    enes193._pose_hist = PoseHistory(32)
+    enes193._ws = uwebsockets.WebsocketClient(Socket(a))
+    enes193._ws.settimeout(0)
+    enes193._connected = True
+    yield b
+    enes193._ws.close()
+    b.close()
+
+
+def _deliver(enes193, peer, opcode, payload):
+    peer.sendall(server_frame(opcode, payload))
+    enes193._ws_drain(500)
+
+
+def _binary(op=1, flags=1, seq=7, x=1.5, y=0.5, theta=-0.25):
+    return struct.pack(Enes193._POSE_BIN_FMT, op, flags, seq, x, y, theta)
+
+
+def test_binary_pose_updates_get_pose(enes193, peer):
+    data = _binary()
+    assert len(data) == enes193._POSE_BIN_SIZE == 16
+    _deliver(enes193, peer, uwebsockets.OP_BYTES, data)
+    x, y, theta, visible, ticks, seq = enes193.getPose()
+    assert (x, y, theta, visible, seq) == (1.5, 0.5, -0.25, True, 1)
+    assert enes193.poseAge() >= 0
+
+    _deliver(enes193, peer, uwebsockets.OP_BYTES, _binary(flags=0, x=2.0))
+    assert enes193.getPose()[0] == 2.0
+    assert enes193.getPose()[3] is False
+    assert enes193.getPose()[5] == 2
+
+
+@pytest.mark.parametrize("data", [
+    _binary()[:15],              # short
+    _binary() + b"\x00",         # long
+    _binary(op=2),               # not a pose
+    b"",
+])
+def test_malformed_binary_is_ignored(enes193, peer, data):
+    _deliver(enes193, peer, uwebsockets.OP_BYTES, data)
+    assert enes193.getPose() == (-1.0, -1.0, -1.0, False, 0, 0)
+    assert enes193._ws.open
+
+
+def test_json_pose_still_works(enes193, peer):
+    msg = {"op": "aruco", "x": 1.25, "y": 0.75, "theta": 3.0, "is_visible": True}
+    _deliver(enes193, peer, uwebsockets.OP_TEXT, json.dumps(msg).encode())
+    assert enes193.getPose()[:4] == (1.25, 0.75, 3.0, True)
+
+
+@pytest.mark.parametrize("text", [b"{not json", b'{"op": "aruco", "x": "far"}'])
+def test_bad_json_pose(enes193, peer, text):
+    _deliver(enes193, peer, uwebsockets.OP_TEXT, text)
+    pose = enes193.getPose()
+    if b"far" in text:
+        # Unreadable fields: an invisible pose, like the vision system's own
+        assert pose[:4] == (-1.0, -1.0, -1.0, False) and pose[5] == 1
+    else:
+        assert pose[5] == 0
@@ -0,0 +1,132 @@
+# 100k messages through msgqueue.MessageQueue and through Enes193.print(),
+# the latter ending in a fake socket that keeps every frame written to it,
+# for each overflow policy.
+
+import json
+import random
+import threading
+from collections import deque
+
+import pytest
+
+from enes193 import msgqueue, uwebsockets
+from enes193.hal import _thread, time
+from fake_socket import FakeSocket
+
+N = 100000
+
+
+class Model:
+    # What MessageQueue should do, written the slow and obvious way
+    def __init__(self, slots, max_bytes):
+        self.q = deque()
+        self.slots = slots
+        self.max_bytes = max_bytes
+        self.dropped = 0
+
+    def _fits(self, n):
+        return len(self.q) < self.slots and sum(map(len, self.q)) + n <= self.max_bytes
+
+    def push(self, s, policy):
+        if len(s) > self.max_bytes:
+            self.dropped += 1
+            return False
+        if not self._fits(len(s)):
+            if policy != msgqueue.DROP_OLDEST:
+                self.dropped += 1
+                return False
+            while not self._fits(len(s)):
+                self.q.popleft()
+                self.dropped += 1
+        self.q.append(s)
+        return True
+
+    def pop(self):
+        return self.q.popleft() if self.q else None
+
+
+@pytest.mark.parametrize("policy", [msgqueue.DROP_OLDEST, msgqueue.DROP_NEWEST, msgqueue.BLOCK])
+def test_queue_matches_model(policy):
+    rnd = random.Random(policy)
+    q = msgqueue.MessageQueue(32, 2048)
+    model = Model(32, 2048)
+    items = q._items
+    for i in range(N):
+        s = "m%d" % i + "x" * rnd.choice((0, 5, 60, 300, 2100))
+        assert q.push(s, policy) == model.push(s, policy)
+        if rnd.random() < 0.3:
+            for _ in range(rnd.randrange(4)):
+                assert q.pop() == model.pop()
+        assert len(q) == len(model.q)
+    assert q.pop_all() == list(model.q)
+    assert q.dropped == model.dropped
+    assert q._bytes == 0
+    # The slot list is the one allocated up front
+    assert q._items is items and len(items) == 32
+
+
+def _session(enes193, policy):
+    enes193._lock = _thread.allocate_lock()
+    enes193.PRINT_OVERFLOW = policy
+    enes193._print_queue = None
+    enes193._configure("Stress", "WATER", 3, 1120)
+    sock = FakeSocket()
+    enes193._ws = uwebsockets.WebsocketClient(sock)
+    enes193._connected = True
+    return sock
+
+
+def _lines(sock):
+    out = []
+    for payload in sock.messages():
+        msg = json.loads(payload)
+        assert msg["op"] == "print" and msg["teamName"] == "Stress"
+        out += [int(line) for line in msg["message"].split("\n")]
+    return out
+
+
+@pytest.mark.parametrize("policy", [msgqueue.DROP_OLDEST, msgqueue.DROP_NEWEST])
+def test_print_drops_by_policy(enes193, policy):
+    sock = _session(enes193, policy)
+    batch = 50   # more than the 32 slots, so every flush follows overflow
+    for i in range(N):
+        enes193.print(i)
+        if i % batch == batch - 1:
+            enes193._flush_print_queue()
+    enes193._flush_print_queue()
+    lines = _lines(sock)
+    sock.close()
+
+    assert len(lines) + enes193.printDropped() == N
+    assert len(lines) == 32 * N // batch
+    if policy == msgqueue.DROP_OLDEST:
+        expected = [i for i in range(N) if i % batch >= batch - 32]
+    else:
+        expected = [i for i in range(N) if i % batch < 32]
+    assert lines == expected
+
+
+def test_print_block_loses_nothing(enes193):
+    sock = _session(enes193, msgqueue.BLOCK)
+    enes193._thread_started = True   # print() only blocks with a worker running
+    done = []
+
+    def worker():
+        while not done:
+            enes193._flush_print_queue()
+            time.sleep_ms(1)
+        enes193._flush_print_queue()
+
+    t = threading.Thread(target=worker)
+    t.start()
+    try:
+        for i in range(N):
+            assert enes193.print(i)
+    finally:
+        done.append(True)
+        t.join()
+    lines = _lines(sock)
+    sock.close()
+
+    assert enes193.printDropped() == 0
+    assert lines == list(range(N))
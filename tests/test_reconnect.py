@@ -0,0 +1,102 @@
+# How the worker reconnects after the vision system goes away: at once the
+# first time, then backing off with jitter, and without touching WiFi when
+# only the websocket died.
+
+import random
+import time as _time
+
+import pytest
+
+from enes193 import sim
+from vision_server import wait_until
+
+
+@pytest.fixture
+def attempts(enes193, monkeypatch):
+    # Monotonic time of every connect attempt and (low, high, chosen) of
+    # every backoff delay drawn, with the jitter seeded
+    record = {"connects": [], "delays": []}
+    connect = enes193._connect_ws_and_begin.__func__
+    rnd = random.Random(17)
+
+    def connect_ws_and_begin(cls):
+        record["connects"].append(_time.monotonic())
+        return connect(cls)
+
+    def randint(a, b):
+        n = rnd.randint(a, b)
+        record["delays"].append((a, b, n))
+        return n
+
+    monkeypatch.setattr(enes193, "_connect_ws_and_begin", classmethod(connect_ws_and_begin))
+    monkeypatch.setattr(random, "randint", randint)
+    return record
+
+
+@pytest.fixture
+def wlan_calls(monkeypatch):
+    # Arguments of every WLAN.active() call that changes the interface
+    calls = []
+    active = sim._WLAN.active
+
+    def record(self, flag=None):
+        if flag is not None:
+            calls.append(flag)
+        return active(self, flag)
+
+    monkeypatch.setattr(sim._WLAN, "active", record)
+    return calls
+
+
+def test_first_reconnect_is_immediate(enes193, vision, attempts, wlan_calls):
+    server = vision()
+    del wlan_calls[:]
+    t = _time.monotonic()
+    server.drop_clients()
+    assert wait_until(lambda: server.count("begin") == 2)
+    assert _time.monotonic() - t < 0.1
+    assert attempts["delays"] == []
+    assert wlan_calls == []
+
+
+def test_backoff_grows_with_jitter(enes193, vision, attempts, wlan_calls):
+    enes193._RECONNECT_MIN_MS = 50
+    server = vision()
+    del wlan_calls[:]
+    del attempts["connects"][:]
+    del attempts["delays"][:]
+    server.close()   # the port now refuses connections
+
+    assert wait_until(lambda: len(attempts["connects"]) >= 5, timeout=5.0)
+    delays = attempts["delays"][:4]
+    assert [(a, b) for a, b, _ in delays] == [(25, 50), (50, 100), (100, 200), (200, 400)]
+    # Jittered: not simply the top of each range
+    assert [n for _, b, n in delays] != [b for _, b, _ in delays]
+
+    # The first attempt comes straight after the drop, each later one
+    # waits out the delay drawn after the failure before it
+    connects = attempts["connects"]
+    for (_, _, n), a, b in zip(delays, connects, connects[1:]):
+        assert n / 1000 <= b - a < n / 1000 + 0.1
+
+    assert wlan_calls == []
+    assert enes193._wifi_failures == 0
+
+
+def test_silent_server_is_dropped_after_keepalive(enes193, vision):
+    enes193.KEEPALIVE_INTERVAL_MS = 200
+    enes193.KEEPALIVE_TIMEOUT_MS = 300
+    server = vision()
+    assert wait_until(lambda: enes193.getRTT() >= 0)
+    assert enes193.getRTT() < 100
+
+    ws = enes193._ws
+    server.hang = True
+    t = _time.monotonic()
+    assert wait_until(lambda: not ws.open)
+    # At most an interval until the next ping, then the timeout
+    assert 0.3 <= _time.monotonic() - t < 0.6
+
+    server.hang = False
+    assert wait_until(lambda: server.count("begin") >= 2)
+    assert wait_until(lambda: enes193._ws is not ws and enes193._ws_ok())
@@ -0,0 +1,119 @@
+# tank.read_distance() and background ranging against the simulated
+# ultrasonic sensor in enes193/sim.py.
+
+import sys
+
+import pytest
+
+from enes193 import sim
+from enes193.hal import time
+from enes193.tank import tank, _filtered_cm
+
+
+@pytest.fixture
+def echo(monkeypatch):
+    def set_echo(us):
+        monkeypatch.setattr(sim, "echo_us", us)
+    return set_echo
+
+
+@pytest.fixture
+def ranging():
+    yield tank
+    tank.stop_ranging()
+
+
+def _settle(cond, timeout_ms=1000):
+    # Polls cond() while the ranging timer runs; returns cond()
+    t0 = time.ticks_ms()
+    while time.ticks_diff(time.ticks_ms(), t0) < timeout_ms:
+        if cond():
+            return True
+        time.sleep_ms(5)
+    return cond()
+
+
+def _elapsed_ms(f, *args):
+    t0 = time.ticks_ms()
+    result = f(*args)
+    return result, time.ticks_diff(time.ticks_ms(), t0)
+
+
+def test_filtered_cm():
+    assert _filtered_cm([0, 0]) == (-1, 0)
+    cm, n = _filtered_cm([582, 0, 5820, 600, 590])
+    assert n == 4 and round(cm) == 10
+    cm, n = _filtered_cm([100, 582, 582, 582, 582, 582, 582, 9000], "trimmed_mean")
+    assert n == 8 and round(cm) == 10
+
+
+@pytest.mark.parametrize("echo_us", [580, None])
+def test_bad_method_raises_even_without_echoes(echo, echo_us):
+    echo(echo_us)
+    with pytest.raises(ValueError):
+        tank.read_distance(3, "mean")
+    with pytest.raises(ValueError):
+        _filtered_cm([], "mean")
+
+
+def test_readings_are_a_period_apart_from_the_trigger(echo):
+    echo(580)
+    (cm, n), ms = _elapsed_ms(tank.read_distance, 3)
+    assert n == 3 and round(cm) == 10
+    assert 2 * tank.SAMPLE_PERIOD_MS <= ms < 2 * tank.SAMPLE_PERIOD_MS + 40
+
+
+def test_timeouts_count_towards_the_period(echo):
+    # Each reading waits 30 ms for an echo that never comes; that time is
+    # part of the period, not added to it
+    echo(None)
+    (cm, n), ms = _elapsed_ms(tank.read_distance, 3)
+    assert (cm, n) == (-1, 0)
+    assert ms < 2 * tank.SAMPLE_PERIOD_MS + 30 + 40
+
+
+def test_get_distance_is_unknown_before_the_first_reading(echo, ranging):
+    echo(580)
+    assert tank.get_distance() == -1
+    assert tank._timer is not None
+
+
+def test_ranging_settles_on_the_median(echo, ranging):
+    echo(580)   # about 10 cm
+    tank.start_ranging(period_ms=20)
+    assert _settle(lambda: tank._hist_n == len(tank._hist))
+    assert tank.get_distance() == pytest.approx(10, abs=1)
+    echo(1164)  # about 20 cm
+    assert _settle(lambda: abs(tank.get_distance() - 20) < 1)
+    assert tank.read_distance(3)[1] == 3
+
+
+def test_ranging_with_nothing_in_range(echo, ranging):
+    echo(580)
+    tank.start_ranging(period_ms=20)
+    assert _settle(lambda: tank.get_distance() > 0)
+    echo(None)
+    assert _settle(lambda: tank.get_distance() == -1)
+    assert tank.read_distance(3) == (-1, 0)
+
+
+def test_read_distance_sensor_defers_to_ranging(echo, ranging, monkeypatch):
+    def time_pulse_us(*args):
+        raise AssertionError("sensor pulsed outside the ranging loop")
+
+    monkeypatch.setattr(sys.modules["enes193.tank"], "time_pulse_us", time_pulse_us)
+    echo(580)
+    tank.start_ranging(period_ms=20)
+    assert _settle(lambda: tank.get_distance() > 0)
+    assert tank.read_distance_sensor() == tank.get_distance()
+
+
+def test_stop_ranging_releases_the_echo_irq(echo, ranging):
+    echo(580)
+    tank.start_ranging(period_ms=20)
+    assert sim._pins[sim.ECHO_PIN]._handler is not None
+    tank.stop_ranging()
+    assert tank._timer is None
+    assert sim._pins[sim.ECHO_PIN]._handler is None
+    # Blocking reads work again
+    assert round(tank.read_distance_sensor()) == 10
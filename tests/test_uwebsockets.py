@@ -0,0 +1,307 @@
+# Websocket framing over a local socket pair, using the CPython backend from
+# enes193/sim.py.
+
+import errno
+import re
+import socket
+import struct
+import threading
+import time
+
+import pytest
+
+from enes193 import uwebsockets
+from enes193.sim import Socket
+from fake_socket import server_frame
+
+
+def _pair(max_message_size=uwebsockets.MAX_MESSAGE_SIZE):
+    a, b = socket.socketpair()
+    ws = uwebsockets.WebsocketClient(Socket(a), max_message_size)
+    ws.settimeout(0.5)
+    return ws, b
+
+
+def _client_frame(peer):
+    # (opcode, unmasked payload) of the next frame the client sent
+    head = peer.recv(2)
+    n = head[1] & 0x7f
+    if n == 126:
+        n = struct.unpack('!H', peer.recv(2))[0]
+    key = peer.recv(4)
+    data = b''
+    while len(data) < n:
+        data += peer.recv(n - len(data))
+    return head[0] & 0x0f, bytes(b ^ key[k % 4] for k, b in enumerate(data))
+
+
+def _close_code(peer):
+    opcode, data = _client_frame(peer)
+    assert opcode == uwebsockets.OP_CLOSE
+    return struct.unpack('!H', data[:2])[0]
+
+
+def _send_split(peer, data, cut):
+    peer.sendall(data[:cut])
+    time.sleep(0.05)
+    peer.sendall(data[cut:])
+
+
+@pytest.mark.parametrize("cut", [1, 3, 4, 100, 8000])
+def test_message_at_limit_split_across_reads(cut):
+    ws, peer = _pair()
+    payload = bytes(range(256)) * 31 + b'x' * 2   # 7938 bytes
+    payload += b'y' * (8190 - len(payload))
+    _send_split(peer, server_frame(uwebsockets.OP_BYTES, payload), cut)
+    assert ws.recv() == payload
+    assert ws.open
+
+
+@pytest.mark.parametrize("split", [False, True])
+def test_limit_counts_payload_only(split):
+    ws, peer = _pair(max_message_size=10)
+    data = server_frame(uwebsockets.OP_TEXT, b'0123456789')
+    if split:
+        _send_split(peer, data, 5)
+    else:
+        peer.sendall(data)
+    assert ws.recv() == '0123456789'
+
+
+@pytest.mark.parametrize("split", [False, True])
+def test_oversized_frame_rejected_however_it_arrives(split):
+    ws, peer = _pair(max_message_size=10)
+    data = server_frame(uwebsockets.OP_TEXT, b'0123456789a')
+    if split:
+        _send_split(peer, data, 5)
+    else:
+        peer.sendall(data)
+    assert ws.recv() is None
+    assert not ws.open
+    assert _close_code(peer) == uwebsockets.CLOSE_TOO_BIG
+
+
+def test_several_frames_in_one_read():
+    ws, peer = _pair()
+    peer.sendall(server_frame(uwebsockets.OP_TEXT, b'a') + server_frame(uwebsockets.OP_TEXT, b'bc'))
+    assert ws.recv() == 'a'
+    assert ws.recv() == 'bc'
+    assert ws.recv() == ''
+
+
+def _fragments(peer, opcode, *parts):
+    # One message sent as len(parts) frames
+    frames = [server_frame(opcode, parts[0], fin=len(parts) == 1)]
+    for k, part in enumerate(parts[1:], 2):
+        frames.append(server_frame(uwebsockets.OP_CONT, part, fin=k == len(parts)))
+    peer.sendall(b''.join(frames))
+
+
+def test_fragmented_message_is_reassembled():
+    ws, peer = _pair()
+    _fragments(peer, uwebsockets.OP_TEXT, b'Hel', b'lo, ', b'world')
+    assert ws.recv() == 'Hello, world'
+    assert ws.open
+
+
+def test_ping_between_fragments_is_answered():
+    ws, peer = _pair()
+    peer.sendall(server_frame(uwebsockets.OP_BYTES, b'ab', fin=False)
+                 + server_frame(uwebsockets.OP_PING, b'hb')
+                 + server_frame(uwebsockets.OP_CONT, b'cd'))
+    assert ws.recv() == b'abcd'
+    assert _client_frame(peer) == (uwebsockets.OP_PONG, b'hb')
+
+
+def test_fragmented_messages_share_one_buffer():
+    ws, peer = _pair()
+    _fragments(peer, uwebsockets.OP_BYTES, b'x' * 100, b'y' * 100)
+    assert ws.recv() == b'x' * 100 + b'y' * 100
+    buf = ws._mbuf
+    _fragments(peer, uwebsockets.OP_TEXT, b'1', b'2', b'3')
+    assert ws.recv() == '123'
+    assert ws._mbuf is buf
+
+
+@pytest.mark.parametrize("frames", [
+    # Continuation with nothing to continue
+    server_frame(uwebsockets.OP_CONT, b'x'),
+    # New message before the last one finished
+    server_frame(uwebsockets.OP_TEXT, b'a', fin=False) + server_frame(uwebsockets.OP_TEXT, b'b'),
+])
+def test_bad_fragment_sequence_closes_1002(frames):
+    ws, peer = _pair()
+    peer.sendall(frames)
+    with pytest.raises(uwebsockets.ConnectionClosed):
+        ws.recv()
+    assert not ws.open
+    assert _close_code(peer) == uwebsockets.CLOSE_PROTOCOL_ERROR
+
+
+def test_fragmented_message_over_limit_closes_1009():
+    # Each fragment fits; together they don't
+    ws, peer = _pair(max_message_size=10)
+    _fragments(peer, uwebsockets.OP_TEXT, b'012345', b'6789', b'a')
+    with pytest.raises(uwebsockets.ConnectionClosed):
+        ws.recv()
+    assert not ws.open
+    assert _close_code(peer) == uwebsockets.CLOSE_TOO_BIG
+
+
+def _ping(ws, peer):
+    # Lets a keepalive ping fall due and returns the payload the peer got
+    time.sleep(0.03)
+    ws.check_keepalive()
+    opcode, payload = _client_frame(peer)
+    assert opcode == uwebsockets.OP_PING
+    return payload
+
+
+def test_matching_pong_sets_rtt():
+    ws, peer = _pair()
+    ws.keepalive(20)
+    assert ws.rtt_ms == -1
+    payload = _ping(ws, peer)
+    time.sleep(0.02)
+    peer.sendall(server_frame(uwebsockets.OP_PONG, payload))
+    assert ws.recv() == ''
+    assert 20 <= ws.rtt_ms < 100
+    assert not ws._ping_out
+
+
+def test_pong_for_another_ping_is_ignored():
+    ws, peer = _pair()
+    ws.keepalive(20)
+    payload = _ping(ws, peer)
+    wrong = struct.pack('<I', struct.unpack('<I', payload)[0] ^ 1)
+    peer.sendall(server_frame(uwebsockets.OP_PONG, wrong))
+    assert ws.recv() == ''
+    assert ws.rtt_ms == -1
+    assert ws._ping_out
+
+
+def test_silent_peer_times_out():
+    ws, peer = _pair()
+    ws.keepalive(50, 100)
+    t0 = time.monotonic()
+    with pytest.raises(uwebsockets.ConnectionClosed):
+        while True:
+            time.sleep(ws.check_keepalive() / 1000)
+    # One interval until the ping, then the timeout waiting for its pong
+    # (less a tick: the ms clock truncates)
+    assert 0.145 <= time.monotonic() - t0 < 0.2
+    assert not ws.open
+    assert _client_frame(peer)[0] == uwebsockets.OP_PING
+
+
+@pytest.mark.parametrize("n", [0, 1, 2, 3, 4, 5, 7, 125, 126, 1001])
+def test_client_frames_are_masked_per_rfc(n):
+    ws, peer = _pair()
+    payload = bytes(k & 0xff for k in range(n))
+    ws.write_frame(uwebsockets.OP_BYTES, payload)
+    hlen = 2 if n < 126 else 4
+    raw = b''
+    while len(raw) < hlen + 4 + n:
+        raw += peer.recv(4096)
+    assert raw[1] & 0x80
+    key = raw[hlen:hlen + 4]
+    assert bytes(b ^ key[k % 4] for k, b in enumerate(raw[hlen + 4:])) == payload
+
+
+@pytest.mark.parametrize("n", [1, 6, 4096])
+def test_masked_frames_round_trip(n):
+    a, b = socket.socketpair()
+    client = uwebsockets.WebsocketClient(Socket(a))
+    server = uwebsockets.Websocket(Socket(b))
+    server.settimeout(0.5)
+    payload = bytes(range(256)) * (n // 256) + b'z' * (n % 256)
+    client.write_frame(uwebsockets.OP_BYTES, payload)
+    client.write_frame(uwebsockets.OP_BYTES, payload[:3], payload[3:])
+    assert server.recv() == payload
+    assert server.recv() == payload
+
+
+@pytest.fixture
+def upgrade():
+    # Serves one connection: reads the upgrade request and answers it with
+    # respond(key). Returns the URL to connect to; the server's end of the
+    # connection is appended to upgrade.conns.
+    listener = socket.socket()
+    listener.bind(("127.0.0.1", 0))
+    listener.listen(1)
+    conns = []
+
+    def start(respond):
+        def serve():
+            c, _ = listener.accept()
+            conns.append(c)
+            req = b''
+            while b'\r\n\r\n' not in req:
+                req += c.recv(1024)
+            key = re.search(rb'Sec-WebSocket-Key: (\S+)', req).group(1)
+            for part in respond(key):
+                c.sendall(part)
+                time.sleep(0.02)
+
+        threading.Thread(target=serve, daemon=True).start()
+        return "ws://127.0.0.1:%d/ws" % listener.getsockname()[1]
+
+    start.conns = conns
+    yield start
+    listener.close()
+    for c in conns:
+        c.close()
+
+
+def _response(key, status='101 Switching Protocols', accept=True):
+    head = 'HTTP/1.1 {}\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n'.format(status)
+    if accept:
+        head += 'Sec-WebSocket-Accept: {}\r\n'.format(
+            uwebsockets._accept_key(key if accept is True else accept))
+    return (head + '\r\n').encode()
+
+
+@pytest.mark.parametrize("respond, error", [
+    (lambda key: [_response(key, accept=b'dGhlIHNhbXBsZSBub25jZQ==')], 'bad Sec-WebSocket-Accept'),
+    (lambda key: [_response(key, accept=False)], 'no Sec-WebSocket-Accept'),
+    (lambda key: [_response(key, status='403 Forbidden')], 'HTTP/1.1 403 Forbidden'),
+])
+def test_rejected_handshake(upgrade, respond, error):
+    url = upgrade(respond)
+    with pytest.raises(uwebsockets.ConnectionClosed) as e:
+        uwebsockets.connect(url)
+    assert e.value.args == (error,)
+    # The client gave its socket back
+    c = upgrade.conns[0]
+    c.settimeout(1)
+    assert c.recv(16) == b''
+
+
+def test_check_response_ignores_header_case_and_spacing():
+    key = b'dGhlIHNhbXBsZSBub25jZQ=='
+    head = ('HTTP/1.1 101 Switching Protocols\r\nsec-websocket-accept:'
+            + uwebsockets._accept_key(key) + '  ').encode()
+    uwebsockets._check_response(head, key)
+
+
+@pytest.mark.parametrize("split", [False, True])
+def test_frame_in_the_same_segment_as_the_101(upgrade, split):
+    def respond(key):
+        data = _response(key) + server_frame(uwebsockets.OP_TEXT, b'hello')
+        # Whole, or with the head itself cut in two
+        return [data[:20], data[20:]] if split else [data]
+
+    ws = uwebsockets.connect(upgrade(respond))
+    ws.settimeout(0.5)
+    assert ws.recv() == 'hello'
+    ws.close()
+
+
+def test_handshake_times_out(upgrade, monkeypatch):
+    monkeypatch.setattr(uwebsockets, "HANDSHAKE_TIMEOUT_MS", 100)
+    url = upgrade(lambda key: [])
+    t0 = time.monotonic()
+    with pytest.raises(OSError) as e:
+        uwebsockets.connect(url)
+    assert e.value.args == (errno.ETIMEDOUT,)
+    assert time.monotonic() - t0 < 0.5
@@ -0,0 +1,64 @@
+# The (URI, address) cache behind reconnects: _connect_ws_and_begin() called
+# directly against the stand-in vision server, without the worker thread.
+
+import socket
+
+import pytest
+
+from enes193 import uwebsockets
+from enes193.hal import _thread
+from vision_server import VisionServer
+
+
+@pytest.fixture
+def server(enes193, monkeypatch):
+    server = VisionServer()
+    lookups = []
+
+    def resolve(uri):
+        lookups.append(uri.hostname)
+        return socket.getaddrinfo(uri.hostname, uri.port)[0][4]
+
+    monkeypatch.setattr(uwebsockets, "resolve", resolve)
+    server.lookups = lookups
+    enes193._lock = _thread.allocate_lock()
+    enes193._ws_targets = {}
+    enes193.ROOM_IP_MAP = {9999: "127.0.0.1"}
+    enes193.WS_PORT = server.port
+    enes193._configure("Sim", "WATER", 3, 9999)
+    yield server
+    enes193._drop_ws()
+    server.close()
+
+
+def test_reconnect_reuses_the_cached_target(enes193, server):
+    enes193._connect_ws_and_begin()
+    assert enes193._ws_ok()
+    assert server.lookups == ["127.0.0.1"]
+    assert "127.0.0.1" in enes193._ws_targets
+
+    for _ in range(3):
+        enes193._connect_ws_and_begin()
+        assert enes193._ws_ok()
+    assert server.lookups == ["127.0.0.1"]
+
+
+def test_failed_connect_evicts_the_target(enes193, server):
+    # The cached address goes stale when the server moves to another port
+    enes193._connect_ws_and_begin()
+    moved = VisionServer()
+    server.close()
+    enes193.WS_PORT = moved.port
+    try:
+        with pytest.raises(OSError):
+            enes193._connect_ws_and_begin()
+        assert not enes193._ws_ok()
+        assert "127.0.0.1" not in enes193._ws_targets
+
+        # The next attempt looks the server up again and finds it
+        enes193._connect_ws_and_begin()
+        assert enes193._ws_ok()
+        assert server.lookups == ["127.0.0.1"] * 2
+    finally:
+        enes193._drop_ws()
+        moved.close()
@@ -0,0 +1,219 @@
+# A stand-in for the vision system, for running Enes193 against on CPython
+# with the sim backend. It speaks enough of the protocol for the pose paths:
+# begin, polled aruco requests, subscribe (pushed poses at the requested
+# rate), mission acks and print.
+#
+# The "camera" produces a frame every FRAME_MS. A pose's x is the number of
+# the frame it came from, so the client can tell how old the pose it holds
+# is (see frame_age_ms()).
+#
+# Run directly to measure end-to-end pose latency in each mode:
+#   python tests/vision_server.py
+
+import base64
+import hashlib
+import json
+import os
+import socket
+import struct
+import sys
+import threading
+import time as _time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from enes193 import sim, uwebsockets
+
+_GUID = b"258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+
+class VisionServer:
+    FRAME_MS = 20
+
+    def __init__(self, subscribe="ok"):
+        """
+        subscribe is how subscribe requests are answered: "ok" to push
+        poses, "unsupported" to refuse, None to ignore them like a server
+        that predates subscriptions.
+        """
+        self.subscribe = subscribe
+        self.pushing = True     # False: stop pushing, as if the stream stalled
+        self.hang = False       # True: stop reading and answering, pings included
+        self.drop_missions = 0  # mission submissions to ignore before acking again
+        self.ops = []           # (op, monotonic time) of every request, in order
+        self.prints = []        # message of every print request, in order
+        self._t0 = _time.monotonic()
+        self._clients = []
+        self._closed = False
+        self._lock = threading.Lock()
+        self._listener = socket.socket()
+        self._listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._listener.bind(("127.0.0.1", 0))
+        self._listener.listen(4)
+        self.port = self._listener.getsockname()[1]
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    # ---- camera ----
+
+    def frame(self):
+        return int((_time.monotonic() - self._t0) * 1000) // self.FRAME_MS
+
+    def frame_age_ms(self, n):
+        """How long ago frame n was captured."""
+        return (_time.monotonic() - self._t0) * 1000 - n * self.FRAME_MS
+
+    # ---- bookkeeping ----
+
+    def count(self, op, since=0):
+        with self._lock:
+            return sum(1 for o, t in self.ops if o == op and t >= since)
+
+    def drop_clients(self):
+        """Close every connection, as if the vision system restarted."""
+        with self._lock:
+            clients, self._clients = self._clients, []
+        for c in clients:
+            try:
+                c.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            c.close()
+
+    def close(self):
+        self._closed = True
+        try:
+            # Wakes the accept thread; close() alone leaves it listening
+            self._listener.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self._listener.close()
+        self.drop_clients()
+
+    # ---- connections ----
+
+    def _accept(self):
+        while not self._closed:
+            try:
+                c, _ = self._listener.accept()
+            except OSError:
+                return
+            with self._lock:
+                self._clients.append(c)
+            threading.Thread(target=self._serve, args=(c,), daemon=True).start()
+
+    def _handshake(self, c):
+        req = b""
+        while b"\r\n\r\n" not in req:
+            data = c.recv(1024)
+            if not data:
+                raise OSError("closed during handshake")
+            req += data
+        for line in req.split(b"\r\n"):
+            if line.lower().startswith(b"sec-websocket-key:"):
+                key = line.split(b":", 1)[1].strip()
+        accept = base64.b64encode(hashlib.sha1(key + _GUID).digest())
+        c.sendall(b"HTTP/1.1 101 Switching Protocols\r\n"
+                  b"Upgrade: websocket\r\nConnection: Upgrade\r\n"
+                  b"Sec-WebSocket-Accept: " + accept + b"\r\n\r\n")
+
+    def _send_pose(self, ws):
+        n = self.frame()
+        ws.write_frame(uwebsockets.OP_BYTES, struct.pack("<BBHfff", 1, 1, n & 0xffff, n, 0.5, 0.25))
+
+    def _serve(self, c):
+        try:
+            self._handshake(c)
+            ws = uwebsockets.Websocket(sim.Socket(c))
+            ws.settimeout(0.005)
+            period = 0
+            due = 0
+            while not self._closed:
+                if self.hang:
+                    _time.sleep(0.005)
+                    continue
+                msg = ws.recv()
+                if msg is None:
+                    return
+                now = _time.monotonic()
+                if msg:
+                    period = self._handle(ws, json.loads(msg), now, period)
+                    due = now
+                if period and self.pushing and now >= due:
+                    self._send_pose(ws)
+                    due = max(due + period, now)
+        except (OSError, ValueError, uwebsockets.ConnectionClosed):
+            pass
+        finally:
+            c.close()
+
+    def _handle(self, ws, msg, now, period):
+        # Answers one request; returns the push period in seconds (0: none)
+        op = msg.get("op")
+        with self._lock:
+            self.ops.append((op, now))
+        if op == "aruco":
+            self._send_pose(ws)
+        elif op == "subscribe" and self.subscribe is not None:
+            ws.send(json.dumps({"op": "subscribe", "status": self.subscribe}))
+            rate = int(msg.get("rate", 0))
+            return 1 / rate if self.subscribe == "ok" and rate > 0 else 0
+        elif op == "mission":
+            if self.drop_missions > 0:
+                self.drop_missions -= 1
+            else:
+                ws.send(json.dumps({"op": "mission", "seq": msg.get("seq"), "status": "ok"}))
+        elif op == "print":
+            with self._lock:
+                self.prints.append(msg.get("message"))
+        return period
+
+
+def wait_until(cond, timeout=3.0):
+    """Poll cond() until it is true or timeout seconds pass; returns cond()."""
+    end = _time.monotonic() + timeout
+    while _time.monotonic() < end:
+        if cond():
+            return True
+        _time.sleep(0.01)
+    return cond()
+
+
+def measure_latency(enes193, server, seconds=2.0):
+    """
+    Median and worst age (ms) of the pose Enes193 holds, sampled every
+    millisecond for `seconds`. Ages count from when the server's camera
+    captured the frame.
+    """
+    ages = []
+    end = _time.monotonic() + seconds
+    while _time.monotonic() < end:
+        pose = enes193.getPose()
+        if pose[5]:
+            ages.append(server.frame_age_ms(int(pose[0])))
+        _time.sleep(0.001)
+    ages.sort()
+    return ages[len(ages) // 2], ages[-1]
+
+
+def main():
+    from enes193.Enes193 import Enes193
+
+    server = VisionServer()
+    Enes193.REQUIRE_KNOWN_MAC = False
+    Enes193.ROOM_IP_MAP[9999] = "127.0.0.1"
+    Enes193.WS_PORT = server.port
+    Enes193.begin("Latency", "WATER", 3, 9999)
+    _time.sleep(0.5)
+    print("mode        median ms  worst ms")
+    print("polling      {:8.1f}  {:8.1f}".format(*measure_latency(Enes193, server)))
+    for rate in (10, 20, 50):
+        Enes193.subscribePose(rate)
+        _time.sleep(0.5)
+        assert Enes193.isPoseStreaming()
+        print("push {:2d} Hz   {:8.1f}  {:8.1f}".format(rate, *measure_latency(Enes193, server)))
+    Enes193.stop()
+    server.close()
+
+
+if __name__ == "__main__":
+    main()